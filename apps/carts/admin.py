@@ -6,12 +6,18 @@ from .models import Cart, CartItem
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 1
+    autocomplete_fields = ("product",)
 
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ("user", "total_cost", "id")
+    # item_count and subtotal are stored on the cart, unlike total_cost() which reads every item
+    list_display = ("user", "item_count", "subtotal", "updated_at", "id")
+    list_select_related = ("user",)
     search_fields = ("user__email",)
+    list_filter = ("updated_at",)
+    raw_id_fields = ("user",)
+    show_full_result_count = False
     inlines = [CartItemInline]
 
 
@@ -0,0 +1,150 @@
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import secrets
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+import redis.asyncio
+
+from config.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "cart-events:"
+
+
+def cart_channel(cart_id):
+    return f"{CHANNEL_PREFIX}{cart_id}"
+
+
+def stream_ticket_key(ticket):
+    return f"cart-events-ticket:{ticket}"
+
+
+def create_stream_ticket(user_id):
+    """
+    A random ticket that opens one event stream for the user within CART_EVENTS_TICKET_TIMEOUT seconds.
+    EventSource cannot send headers, so the ticket goes in the URL in place of the access token, which would
+    otherwise be written to the access logs and stay usable for its whole lifetime.
+    """
+    ticket = secrets.token_urlsafe(32)
+    get_redis_client().set(stream_ticket_key(ticket), user_id, ex=settings.CART_EVENTS_TICKET_TIMEOUT)
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """
+    The id of the user the ticket was created for, or None. A ticket can be redeemed only once.
+    """
+    user_id = get_redis_client().getdel(stream_ticket_key(ticket))
+    return int(user_id) if user_id is not None else None
+
+
+class InProcessBroker:
+    """
+    Fans messages out to the event streams of this process. Subscribers are asyncio queues, so an idle
+    stream costs one queue rather than a thread. publish() is thread-safe and may be called from sync views.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        self._dispatch(channel, message)
+
+    def publish_many(self, messages):
+        for channel, message in messages:
+            self._dispatch(channel, message)
+
+    def _dispatch(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes through Redis so events reach every worker. Each worker holds a single pattern subscription
+    and fans messages out locally, instead of opening a Redis connection per stream.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self._url = url
+        self._listener = None
+
+    def publish(self, channel, message):
+        get_redis_client().publish(channel, message)
+
+    def publish_many(self, messages):
+        with get_redis_client().pipeline(transaction=False) as pipe:
+            for channel, message in messages:
+                pipe.publish(channel, message)
+            pipe.execute()
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        async with super().subscribe(channel) as queue:
+            yield queue
+
+    async def _listen(self):
+        while True:
+            try:
+                client = redis.asyncio.Redis.from_url(self._url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                    async for message in pubsub.listen():
+                        if message["type"] == "pmessage":
+                            self._dispatch(message["channel"].decode(), message["data"].decode())
+            except redis.RedisError:
+                logger.exception("Cart event subscription lost, reconnecting")
+                await asyncio.sleep(1)
+
+
+@functools.cache
+def get_broker():
+    if settings.CART_EVENTS_BROKER == "redis":
+        return RedisBroker(settings.REDIS_CACHE_URL)
+    return InProcessBroker()
+
+
+def publish_cart_event(cart_id, version):
+    try:
+        get_broker().publish(cart_channel(cart_id), json.dumps({"version": version}))
+    except Exception:
+        # Clients fall back to polling with ETags, so a lost event must never fail the cart write
+        logger.exception("Failed to publish event for cart %s", cart_id)
+
+
+def publish_cart_events(versions):
+    """
+    publish_cart_event() for many (cart_id, version) pairs, in a single round trip to the broker.
+    """
+    try:
+        get_broker().publish_many(
+            [(cart_channel(cart_id), json.dumps({"version": version})) for cart_id, version in versions]
+        )
+    except Exception:
+        logger.exception("Failed to publish events for %s carts", len(versions))
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.carts.models import Cart, CartItem
+from apps.carts.utils import delete_cart_items
+from config.db import delete_in_batches
+
+
+class Command(BaseCommand):
+    help = "Delete carts that have been inactive for longer than --days, and optionally stale cart items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Delete carts with no activity for this many days.")
+        parser.add_argument(
+            "--item-days",
+            type=int,
+            default=None,
+            help="Also delete items not updated for this many days from carts that are still active.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        now = timezone.now()
+
+        carts = Cart.objects.filter(updated_at__lt=now - timedelta(days=options["days"]))
+        # The items of each batch are deleted in bulk before the carts, rather than one by one by the cascade,
+        # so a batch costs the same number of queries however many items its carts hold
+        deleted = delete_in_batches(
+            carts,
+            options["batch_size"],
+            options["pause"],
+            before_delete=lambda batch: delete_cart_items(CartItem.objects.filter(cart__in=batch), update_carts=False),
+        )
+
+        if options["item_days"] is not None:
+            items = CartItem.objects.filter(updated_at__lt=now - timedelta(days=options["item_days"]))
+            deleted += delete_in_batches(
+                items, options["batch_size"], options["pause"], before_delete=delete_cart_items
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted[Cart._meta.label]} carts and {deleted[CartItem._meta.label]} cart items "
+                f"in {time.monotonic() - started:.2f}s."
+            )
+        )
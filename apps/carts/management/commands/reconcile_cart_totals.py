@@ -0,0 +1,58 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from apps.carts.models import Cart
+from apps.carts.utils import recalculate_cart_totals
+
+
+class Command(BaseCommand):
+    help = "Verify Cart.item_count and Cart.subtotal against the cart items, optionally fixing any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Rewrite the totals of carts that have drifted.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Carts checked per query.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        checked = drifted = 0
+        last_pk = 0
+
+        while True:
+            pks = list(
+                Cart.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[: options["batch_size"]]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            checked += len(pks)
+
+            mismatched = list(
+                Cart.objects.filter(pk__in=pks)
+                .annotate(
+                    actual_count=Coalesce(Sum("cart_items__quantity"), 0),
+                    actual_subtotal=Coalesce(
+                        Sum(F("cart_items__quantity") * F("cart_items__product__price")), Decimal("0.00")
+                    ),
+                )
+                .filter(~Q(item_count=F("actual_count")) | ~Q(subtotal=F("actual_subtotal")))
+                .values_list("pk", "item_count", "actual_count", "subtotal", "actual_subtotal")
+            )
+            for pk, item_count, actual_count, subtotal, actual_subtotal in mismatched:
+                self.stdout.write(
+                    f"Cart {pk}: item_count {item_count} != {actual_count} or subtotal {subtotal} != {actual_subtotal}"
+                )
+            drifted += len(mismatched)
+
+            if options["fix"] and mismatched:
+                recalculate_cart_totals(Cart.objects.filter(pk__in=[row[0] for row in mismatched]))
+
+        action = "Fixed" if options["fix"] else "Found"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {drifted} drifted carts out of {checked} in {time.monotonic() - started:.2f}s."
+            )
+        )
@@ -0,0 +1,57 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.carts.models import CartItem
+from apps.products.utils import release_stock
+
+
+class Command(BaseCommand):
+    help = "Return stock held by cart items whose reservation has expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Cart items released per transaction.")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        released_items = released_units = 0
+
+        while True:
+            with transaction.atomic():
+                # Skip items locked by an in-flight cart update instead of waiting on them
+                expired = list(
+                    CartItem.objects.select_for_update(skip_locked=True)
+                    .filter(reserved_quantity__gt=0, reserved_until__lt=timezone.now())
+                    .order_by("pk")
+                    .values_list("pk", "product_id", "reserved_quantity")[: options["batch_size"]]
+                )
+                if not expired:
+                    break
+
+                per_product = Counter()
+                for _, product_id, quantity in expired:
+                    per_product[product_id] += quantity
+
+                CartItem.objects.filter(pk__in=[pk for pk, _, _ in expired]).update(
+                    reserved_quantity=0, reserved_until=None
+                )
+                # One UPDATE per product, in a fixed order so concurrent batches cannot deadlock
+                for product_id in sorted(per_product):
+                    release_stock(product_id, per_product[product_id])
+
+            released_items += len(expired)
+            released_units += per_product.total()
+            if len(expired) < options["batch_size"]:
+                break
+            time.sleep(options["pause"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Released {released_units} units from {released_items} cart items "
+                f"in {time.monotonic() - started:.2f}s."
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carts", "0002_initial"),
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cartitem",
+            index=models.Index(fields=["product", "cart"], name="carts_carti_product_0368bc_idx"),
+        ),
+    ]
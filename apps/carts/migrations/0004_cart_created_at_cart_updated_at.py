@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:25
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing carts take their last activity from their most recently updated item
+    Cart = apps.get_model("carts", "Cart")
+    CartItem = apps.get_model("carts", "CartItem")
+    latest_item = (
+        CartItem.objects.filter(cart=OuterRef("pk"))
+        .order_by()
+        .values("cart")
+        .annotate(latest=Max("updated_at"))
+        .values("latest")
+    )
+    Cart.objects.filter(pk__in=CartItem.objects.values("cart")).update(updated_at=Subquery(latest_item))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carts", "0003_cartitem_product_cart_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name="cartitem",
+            index=models.Index(fields=["updated_at"], name="carts_carti_updated_fa97f0_idx"),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carts", "0004_cart_created_at_cart_updated_at"),
+        ("products", "0002_product_stock"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cartitem",
+            name="reserved_quantity",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="cartitem",
+            name="reserved_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="cartitem",
+            index=models.Index(
+                condition=models.Q(("reserved_quantity__gt", 0)),
+                fields=["reserved_until"],
+                name="carts_item_reservation_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:14
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Cart = apps.get_model("carts", "Cart")
+    CartItem = apps.get_model("carts", "CartItem")
+    items = CartItem.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+    Cart.objects.update(
+        item_count=Coalesce(Subquery(items.annotate(total=Sum("quantity")).values("total")), 0),
+        subtotal=Coalesce(
+            Subquery(items.annotate(total=Sum(F("quantity") * F("product__price"))).values("total")),
+            Decimal("0.00"),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carts", "0005_cartitem_reservation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="subtotal",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
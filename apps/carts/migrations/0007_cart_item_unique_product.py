@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-19 03:38
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    # Fold every extra line of a product into the cart's first one, keeping its quantity and reservation
+    CartItem = apps.get_model("carts", "CartItem")
+    duplicates = (
+        CartItem.objects.values("cart_id", "product_id")
+        .annotate(lines=Count("id"), first=Min("id"))
+        .filter(lines__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        items = CartItem.objects.filter(cart_id=duplicate["cart_id"], product_id=duplicate["product_id"])
+        totals = items.aggregate(Sum("quantity"), Sum("reserved_quantity"), Max("reserved_until"))
+        items.filter(pk=duplicate["first"]).update(
+            quantity=totals["quantity__sum"],
+            reserved_quantity=totals["reserved_quantity__sum"],
+            reserved_until=totals["reserved_until__max"],
+        )
+        items.exclude(pk=duplicate["first"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carts", "0006_cart_item_count_subtotal"),
+        ("products", "0006_product_manufacturer_sort_tiebreakers"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(fields=("cart", "product"), name="carts_item_unique_product"),
+        ),
+    ]
@@ -1,11 +1,25 @@
-from django.db import models
+from collections import Counter
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
 
 from apps.products.models import Product
+from apps.products.utils import release_stock, reserve_stock
 from apps.users.models import User
 
 
+class _NotEnoughStock(Exception):
+    pass
+
+
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # last cart activity, used by purge_carts
+    # Kept up to date with F() expressions by every CartItem change, see apps/carts/signals.py
+    item_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     class Meta:
         verbose_name = "Cart"
@@ -22,6 +36,8 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, related_name="cart_items", on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    reserved_quantity = models.PositiveIntegerField(default=0)  # units taken out of product stock for this item
+    reserved_until = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -29,9 +45,63 @@ class CartItem(models.Model):
         verbose_name = "Cart Item"
         verbose_name_plural = "Cart Items"
         ordering = ["-created_at"]
+        constraints = [
+            # Concurrent first adds of a product must end up in one line, with one reservation
+            models.UniqueConstraint(fields=["cart", "product"], name="carts_item_unique_product"),
+        ]
+        indexes = [
+            models.Index(fields=["updated_at"]),
+            models.Index(fields=["product", "cart"]),  # reverse product -> carts lookup for cache invalidation
+            models.Index(
+                fields=["reserved_until"],
+                condition=models.Q(reserved_quantity__gt=0),
+                name="carts_item_reservation_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored line so cart totals can be adjusted by the difference on save
+        instance._loaded_values = dict(zip(field_names, values, strict=True))
+        return instance
 
     def total_price(self):
         return self.quantity * self.product.price
 
+    def reserve_and_save(self, quantity):
+        """
+        Hold ``quantity`` units of the product for this item and save it, taking or returning only the
+        difference from what is already reserved (all of it when the product was changed). The stock UPDATEs
+        come last, after the item and cart writes, so the lock on the product row, which every cart holding
+        the product waits on, is held only until the caller's transaction commits. Returns False, with
+        nothing saved, when there is not enough stock; the instance should then be discarded.
+        """
+        changes = Counter()
+        if self.reserved_quantity:
+            reserved_product_id = getattr(self, "_loaded_values", {}).get("product_id", self.product_id)
+            changes[reserved_product_id] -= self.reserved_quantity
+        previous = (self.reserved_quantity, self.reserved_until)
+        if self.product.stock is None:  # Stock is not tracked for this product
+            self.reserved_quantity, self.reserved_until = 0, None
+        else:
+            changes[self.product_id] += quantity
+            self.reserved_quantity = quantity
+            self.reserved_until = timezone.now() + settings.CART_RESERVATION_TTL
+
+        try:
+            with transaction.atomic():
+                self.save()
+                # In product order, like release_reservations, so that the product locks cannot deadlock
+                for product_id in sorted(changes):
+                    if changes[product_id] > 0 and not reserve_stock(product_id, changes[product_id]):
+                        raise _NotEnoughStock
+                    if changes[product_id] < 0:
+                        release_stock(product_id, -changes[product_id])
+        except _NotEnoughStock:
+            self.reserved_quantity, self.reserved_until = previous
+            return False
+        return True
+
     def __str__(self):
         return f"{self.product.title} ({self.quantity})"
@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from django.forms import ValidationError
 from rest_framework import serializers
 
@@ -50,27 +51,34 @@ class CartItemSerializer(serializers.ModelSerializer):
         product_slug = validated_data.pop("product_slug")
         product = self.validate_slug(product_slug)
         cart = self.context["cart"]
-
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={"quantity": validated_data.get("quantity", 1)},
-        )
-
-        if not created:
-            cart_item.quantity += validated_data.get("quantity", 1)
-            cart_item.save()
-
+        quantity = validated_data.get("quantity", 1)
+
+        with transaction.atomic():
+            # Lock the cart item before reserving stock; the release job takes locks in the same order
+            cart_item = CartItem.objects.select_for_update().filter(cart=cart, product=product).first()
+            try:
+                return self.add(cart_item or CartItem(cart=cart, product=product, quantity=0), quantity)
+            except IntegrityError:
+                # A concurrent request added the product first: add to its line instead
+                return self.add(CartItem.objects.select_for_update().get(cart=cart, product=product), quantity)
+
+    def add(self, cart_item, quantity):
+        cart_item.quantity += quantity
+        if not cart_item.reserve_and_save(cart_item.quantity):
+            raise serializers.ValidationError({"quantity": "Not enough stock available."})
         return cart_item
 
     def update(self, instance, validated_data):
-        if "product_slug" in validated_data:
-            product_slug = validated_data.pop("product_slug")
-            product = self.validate_slug(product_slug)
-            instance.product = product
-
-        instance.quantity = validated_data.get("quantity", instance.quantity)
-        instance.save()
+        with transaction.atomic():
+            if "product_slug" in validated_data:
+                instance.product = self.validate_slug(validated_data.pop("product_slug"))
+            instance.quantity = validated_data.get("quantity", instance.quantity)
+            try:
+                reserved = instance.reserve_and_save(instance.quantity)
+            except IntegrityError:
+                raise serializers.ValidationError({"product_slug": "This product is already in the cart."}) from None
+            if not reserved:
+                raise serializers.ValidationError({"quantity": "Not enough stock available."})
         return instance
 
 
@@ -84,3 +92,9 @@ class CartSerializer(serializers.ModelSerializer):
 
     def get_total_cost(self, obj):
         return obj.total_cost()
+
+
+class CartSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Cart
+        fields = ["item_count", "subtotal"]
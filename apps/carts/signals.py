@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.manufacturers.models import Manufacturer
+from apps.media.images import image_metadata_updated
+from apps.products.models import Product, ProductImage
+from apps.products.signals import products_bulk_updated
+
+from .models import Cart, CartItem
+from .utils import (
+    invalidate_cart,
+    invalidate_carts_for_manufacturer,
+    invalidate_carts_for_product,
+    invalidate_carts_for_products,
+    recalculate_cart_totals,
+    release_cart_items,
+)
+
+
+def update_cart(cart_id, count_delta=0, subtotal_delta=0):
+    # Runs inside the transaction of the CartItem change; every cart write path is atomic
+    Cart.objects.filter(pk=cart_id).update(
+        item_count=F("item_count") + count_delta,
+        subtotal=F("subtotal") + subtotal_delta,
+        updated_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: invalidate_cart(cart_id))
+
+
+def get_product_price(item):
+    # Items loaded without their product (cascades, purge_carts) only need the price, not the whole row
+    if CartItem.product.is_cached(item):
+        return item.product.price
+    return Product.objects.values_list("price", flat=True).get(pk=item.product_id)
+
+
+@receiver(post_save, sender=CartItem)
+def cart_item_saved(sender, instance, **kwargs):
+    loaded = getattr(instance, "_loaded_values", {})
+    old_quantity = loaded.get("quantity", 0)
+    old_product_id = loaded.get("product_id", instance.product_id)
+
+    price = get_product_price(instance)
+    subtotal_delta = instance.quantity * price
+    if old_quantity:
+        if old_product_id == instance.product_id:
+            old_price = price
+        else:
+            old_price = Product.objects.values_list("price", flat=True).get(pk=old_product_id)
+        subtotal_delta -= old_quantity * old_price
+
+    update_cart(instance.cart_id, instance.quantity - old_quantity, subtotal_delta)
+    instance._loaded_values = {**loaded, "product_id": instance.product_id, "quantity": instance.quantity}
+
+
+@receiver(post_delete, sender=CartItem)
+def cart_item_removed(sender, instance, **kwargs):
+    update_cart(instance.cart_id, -instance.quantity, -instance.quantity * get_product_price(instance))
+
+
+@receiver(pre_delete, sender=CartItem)
+def cart_item_deleted(sender, instance, **kwargs):
+    # ClearCartView and purge_carts release whole batches up front, so their items arrive here with nothing
+    # reserved. Otherwise the amount is read again from the locked row, as release_reservations may have
+    # returned it since the item was loaded.
+    if instance.reserved_quantity:
+        release_cart_items(CartItem.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Product)
+def product_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    if getattr(instance, "_loaded_values", {}).get("price") != instance.price:
+        recalculate_cart_totals(Cart.objects.filter(cart_items__product=instance))
+    transaction.on_commit(lambda: invalidate_carts_for_product(instance.pk))
+
+
+@receiver(products_bulk_updated)
+def products_bulk_changed(sender, product_ids, fields, **kwargs):
+    if "price" in fields:
+        carts = CartItem.objects.filter(product_id__in=product_ids).values("cart_id")
+        recalculate_cart_totals(Cart.objects.filter(pk__in=carts))
+    transaction.on_commit(lambda: invalidate_carts_for_products(product_ids))
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_carts_for_product(instance.product_id))
+
+
+@receiver(image_metadata_updated, sender=ProductImage)
+def product_image_metadata_updated(sender, pks, **kwargs):
+    product_ids = list(ProductImage.objects.filter(pk__in=pks).values_list("product_id", flat=True).distinct())
+    transaction.on_commit(lambda: invalidate_carts_for_products(product_ids))
+
+
+@receiver(post_save, sender=Manufacturer)
+def manufacturer_changed(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: invalidate_carts_for_manufacturer(instance.pk))
@@ -0,0 +1,248 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from apps.products.models import Product
+from apps.products.tests import create_products
+from apps.users.models import User
+from apps.users.tokens import UserRefreshToken
+from config.testing import AdminQueryCountTestCase, RedisTestCase
+
+from .events import cart_channel
+from .models import Cart, CartItem
+from .serializers import CartItemSerializer
+from .utils import cart_version_key, get_cart_version, invalidate_carts_for_product
+from .views import CartEventsView
+
+
+def create_carts(start, count):
+    for i in range(start, start + count):
+        cart = Cart.objects.create(user=User.objects.create_user(email=f"user{i}@example.com", password="password"))
+        for product in create_products(i * 3, 3):
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+
+
+class CartAdminTests(AdminQueryCountTestCase):
+    def test_changelist_queries_do_not_grow_with_carts(self):
+        self.assertChangelistQueriesConstant(reverse("admin:carts_cart_changelist"), create_carts)
+
+
+class ReservationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="buyer@example.com", password="password")
+        self.cart = Cart.objects.create(user=self.user)
+        self.product = create_products(0, 1)[0]
+        Product.objects.filter(pk=self.product.pk).update(stock=5)
+        self.client.force_authenticate(self.user)
+
+    def add_item(self, quantity):
+        item = CartItem(cart=self.cart, product=Product.objects.get(pk=self.product.pk), quantity=quantity)
+        self.assertTrue(item.reserve_and_save(quantity))
+        return item
+
+    def assertStock(self, stock):
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, stock)
+
+    def expire(self, item):
+        CartItem.objects.filter(pk=item.pk).update(reserved_until=timezone.now() - timedelta(minutes=1))
+        call_command("release_reservations", stdout=StringIO())
+
+    def test_reserve_takes_only_the_difference(self):
+        item = self.add_item(3)
+        self.assertStock(2)
+        self.assertTrue(item.reserve_and_save(1))
+        self.assertStock(4)
+        item.quantity = 6
+        self.assertFalse(item.reserve_and_save(6))
+        self.assertStock(4)
+        self.assertEqual(item.reserved_quantity, 1)
+        item.refresh_from_db()
+        self.assertEqual((item.quantity, item.reserved_quantity), (3, 1))
+
+    def test_reserve_fails_without_enough_stock(self):
+        item = CartItem(cart=self.cart, product=Product.objects.get(pk=self.product.pk), quantity=6)
+        self.assertFalse(item.reserve_and_save(6))
+        self.assertStock(5)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_stock_is_reserved_last(self):
+        item = CartItem(cart=self.cart, product=Product.objects.get(pk=self.product.pk), quantity=3)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(item.reserve_and_save(3))
+        statements = [
+            query["sql"] for query in queries if not query["sql"].startswith(("SAVEPOINT", "RELEASE", "EXPLAIN"))
+        ]
+        # The product row stays locked from this UPDATE until the commit
+        self.assertTrue(statements[-1].startswith('UPDATE "products_product"'), statements[-1])
+        self.assertEqual(sum('"products_product"' in sql and sql.startswith("UPDATE") for sql in statements), 1)
+
+    def test_changing_the_product_moves_the_reservation(self):
+        other = create_products(1, 1)[0]
+        Product.objects.filter(pk=other.pk).update(stock=5)
+        item = CartItem.objects.get(pk=self.add_item(3).pk)
+        serializer = CartItemSerializer(item, data={"product_slug": other.slug, "quantity": 2})
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.assertStock(5)
+        self.assertEqual(Product.objects.get(pk=other.pk).stock, 3)
+
+    def test_concurrent_first_adds_merge_into_one_line(self):
+        self.add_item(1)
+        serializer = CartItemSerializer(
+            data={"product_slug": self.product.slug, "quantity": 2}, context={"cart": self.cart}
+        )
+        self.assertTrue(serializer.is_valid())
+        # The other request's line is not visible yet when this one looks for it
+        with mock.patch.object(QuerySet, "first", return_value=None):
+            serializer.save()
+        item = CartItem.objects.get()
+        self.assertEqual((item.quantity, item.reserved_quantity), (3, 3))
+        self.assertStock(2)
+
+    def test_untracked_stock_is_never_short(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=None)
+        self.add_item(100)
+        self.assertStock(None)
+
+    def test_delete_releases_stock(self):
+        self.add_item(3)
+        response = self.client.delete(reverse("update-cart-item", args=[self.product.slug]))
+        self.assertEqual(response.status_code, 204)
+        self.assertStock(5)
+
+    def test_expired_reservations_are_released(self):
+        item = self.add_item(3)
+        self.expire(item)
+        self.assertStock(5)
+        item.refresh_from_db()
+        self.assertEqual((item.reserved_quantity, item.reserved_until), (0, None))
+
+    def test_delete_after_expiry_releases_once(self):
+        item = self.add_item(3)
+        # Loaded before the release job runs, as a concurrent request would
+        stale = CartItem.objects.get(pk=item.pk)
+        self.expire(item)
+        stale.delete()
+        self.assertStock(5)
+
+    def test_clear_cart_after_expiry_releases_once(self):
+        item = self.add_item(3)
+        self.expire(item)
+        response = self.client.delete(reverse("clear-cart"))
+        self.assertEqual(response.status_code, 204)
+        self.assertStock(5)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_purge_carts_releases_stock(self):
+        self.add_item(3)
+        Cart.objects.filter(pk=self.cart.pk).update(updated_at=timezone.now() - timedelta(days=60))
+        call_command("purge_carts", "--days", "30", "--pause", "0", stdout=StringIO())
+        self.assertStock(5)
+        self.assertFalse(Cart.objects.exists())
+
+
+class PurgeCartsTests(TestCase):
+    def setUp(self):
+        self.products = create_products(0, 2)
+        Product.objects.update(stock=100)
+
+    def create_carts(self, start, count):
+        carts = []
+        for i in range(start, start + count):
+            cart = Cart.objects.create(user=User.objects.create_user(email=f"user{i}@example.com", password="password"))
+            for product in self.products:
+                item = CartItem(cart=cart, product=Product.objects.get(pk=product.pk), quantity=2)
+                self.assertTrue(item.reserve_and_save(2))
+            carts.append(cart)
+        return carts
+
+    def purge(self, *args):
+        # Returns the number of queries and of callbacks left to run after the commit
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            call_command("purge_carts", "--pause", "0", *args, stdout=StringIO())
+        return len(queries), len(callbacks)
+
+    def test_batch_queries_do_not_grow_with_items(self):
+        stale = timezone.now() - timedelta(days=60)
+        self.create_carts(0, 2)
+        Cart.objects.update(updated_at=stale)
+        baseline = self.purge()
+        self.assertEqual(baseline[1], 1)
+
+        self.create_carts(2, 6)
+        Cart.objects.update(updated_at=stale)
+        self.assertEqual(self.purge(), baseline)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(set(Product.objects.values_list("stock", flat=True)), {100})
+
+    def test_stale_items_of_active_carts(self):
+        cart = self.create_carts(0, 1)[0]
+        CartItem.objects.filter(product=self.products[0]).update(updated_at=timezone.now() - timedelta(days=10))
+        self.assertEqual(self.purge("--item-days", "7")[1], 1)
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.subtotal), (2, 2 * self.products[1].price))
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 100)
+
+
+class CartInvalidationTests(RedisTestCase):
+    def setUp(self):
+        self.product = create_products(0, 1)[0]
+        self.carts = []
+        for i in range(5):
+            cart = Cart.objects.create(user=User.objects.create_user(email=f"user{i}@example.com", password="password"))
+            CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+            self.carts.append(cart)
+        for cart in self.carts:
+            self.addCleanup(cache.delete, cart_version_key(cart.pk))
+
+    @mock.patch("apps.carts.utils.INVALIDATE_BATCH_SIZE", 2)
+    def test_product_change_bumps_and_notifies_every_cart(self):
+        versions = {cart.pk: get_cart_version(cart.pk) for cart in self.carts}
+        # An evicted version restarts from a value no earlier snapshot can carry
+        cache.delete(cart_version_key(self.carts[0].pk))
+
+        with mock.patch("apps.carts.events.get_broker") as get_broker:
+            invalidate_carts_for_product(self.product.pk)
+
+        published = {}
+        for call in get_broker.return_value.publish_many.call_args_list:
+            published.update(call.args[0])
+        self.assertEqual(get_broker.return_value.publish_many.call_count, 3)
+        for cart in self.carts:
+            version = get_cart_version(cart.pk)
+            self.assertGreater(version, versions[cart.pk])
+            self.assertEqual(json.loads(published[cart_channel(cart.pk)]), {"version": version})
+
+
+class CartEventsAuthenticationTests(RedisTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="buyer@example.com", password="password")
+        self.access_token = str(UserRefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self, query="", **headers):
+        return CartEventsView().authenticate(RequestFactory().get(f"/api/v1/cart/events{query}", headers=headers))
+
+    def test_ticket_opens_one_stream(self):
+        response = self.client.post(
+            reverse("cart-events-ticket"), headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        self.assertEqual(response.status_code, 201)
+        ticket = response.json()["ticket"]
+        self.assertEqual(self.authenticate(f"?ticket={ticket}"), self.user.pk)
+        self.assertIsNone(self.authenticate(f"?ticket={ticket}"))
+
+    def test_access_token_is_not_accepted_in_the_url(self):
+        self.assertIsNone(self.authenticate(f"?token={self.access_token}"))
+        self.assertEqual(self.authenticate(Authorization=f"Bearer {self.access_token}"), self.user.pk)
@@ -1,9 +1,12 @@
 from django.urls import path
 
-from .views import CartDetailView, CartView, ClearCartView
+from .views import CartDetailView, CartEventsTicketView, CartEventsView, CartSummaryView, CartView, ClearCartView
 
 urlpatterns = [
     path("item", CartView.as_view(), name="carts-list"),
+    path("summary", CartSummaryView.as_view(), name="cart-summary"),
+    path("events", CartEventsView.as_view(), name="cart-events"),
+    path("events/ticket", CartEventsTicketView.as_view(), name="cart-events-ticket"),
     path("item/<slug:product_slug>", CartDetailView.as_view(), name="update-cart-item"),
     path("clear", ClearCartView.as_view(), name="clear-cart"),
 ]
@@ -0,0 +1,121 @@
+import itertools
+from collections import Counter
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, prefetch_related_objects
+from django.db.models.functions import Coalesce
+
+from apps.products.utils import release_stock
+from config.cache import bump_version, bump_versions, get_version
+
+from .events import publish_cart_event, publish_cart_events
+from .models import Cart, CartItem
+from .serializers import CartSerializer
+
+CART_SNAPSHOT_TIMEOUT = 60 * 60 * 24  # 1 day
+# Carts invalidated per Redis round trip when a product they hold changes
+INVALIDATE_BATCH_SIZE = 500
+
+
+def cart_version_key(cart_id):
+    return f"cart:{cart_id}:version"
+
+
+def get_cart_version(cart_id):
+    return get_version(cart_version_key(cart_id))
+
+
+def get_cart_snapshot(cart, version):
+    # Snapshots are keyed by version, so bumping the version is all it takes to invalidate them
+    snapshot_key = f"cart:{cart.pk}:snapshot:{version}"
+    data = cache.get(snapshot_key)
+    if data is None:
+        prefetch_related_objects([cart], "cart_items__product__manufacturer", "cart_items__product__images")
+        data = CartSerializer(cart).data
+        cache.set(snapshot_key, data, CART_SNAPSHOT_TIMEOUT)
+    return data
+
+
+def invalidate_cart(cart_id):
+    version = bump_version(cart_version_key(cart_id))
+    publish_cart_event(cart_id, version)
+
+
+def invalidate_cart_ids(cart_ids):
+    # Two round trips for the whole list: one pipeline of version bumps, one of events
+    versions = bump_versions([cart_version_key(cart_id) for cart_id in cart_ids])
+    publish_cart_events(list(zip(cart_ids, versions, strict=True)))
+
+
+def invalidate_carts(cart_items):
+    # Uses the (product, cart) index on CartItem as the reverse product -> carts lookup. A popular product
+    # sits in many carts, so their versions are bumped and their events published a batch at a time.
+    cart_ids = cart_items.values_list("cart_id", flat=True).distinct().iterator(chunk_size=INVALIDATE_BATCH_SIZE)
+    for batch in itertools.batched(cart_ids, INVALIDATE_BATCH_SIZE):
+        invalidate_cart_ids(batch)
+
+
+def invalidate_carts_for_product(product_id):
+    invalidate_carts(CartItem.objects.filter(product_id=product_id))
+
+
+def invalidate_carts_for_products(product_ids):
+    invalidate_carts(CartItem.objects.filter(product_id__in=product_ids))
+
+
+def invalidate_carts_for_manufacturer(manufacturer_id):
+    invalidate_carts(CartItem.objects.filter(product__manufacturer_id=manufacturer_id))
+
+
+def release_cart_items(items):
+    """
+    Return the stock reserved by the given cart items and clear their reservations, inside the caller's
+    transaction. The amounts are read from the locked rows rather than from loaded instances, so units that
+    release_reservations returned in the meantime are not returned twice. Every row is locked, reserved or
+    not, so that none takes a new reservation before the caller deletes it. Returns the units released.
+    """
+    rows = items.select_for_update().order_by("pk").values_list("pk", "product_id", "reserved_quantity")
+    reserved = [(pk, product_id, quantity) for pk, product_id, quantity in rows if quantity]
+    if not reserved:
+        return 0
+
+    per_product = Counter()
+    for _, product_id, quantity in reserved:
+        per_product[product_id] += quantity
+    CartItem.objects.filter(pk__in=[pk for pk, _, _ in reserved]).update(reserved_quantity=0, reserved_until=None)
+    # One UPDATE per product, in the same fixed order as release_reservations so the two cannot deadlock
+    for product_id in sorted(per_product):
+        release_stock(product_id, per_product[product_id])
+    return per_product.total()
+
+
+def delete_cart_items(items, update_carts=True):
+    """
+    Delete cart items in bulk, inside the caller's transaction: release their reservations, delete them in one
+    statement without loading them or sending their delete signals, then rebuild the totals of their carts
+    in one UPDATE (unless the carts are being deleted too) and invalidate the carts once after the commit.
+    The item signals would instead update, and invalidate, the cart once per item.
+    Returns a Counter of deleted rows, as from delete_in_batches().
+    """
+    release_cart_items(items)
+    cart_ids = sorted(set(items.values_list("cart_id", flat=True)))
+    deleted = items._raw_delete(items.db)
+    if update_carts:
+        recalculate_cart_totals(Cart.objects.filter(pk__in=cart_ids))
+    if cart_ids:
+        transaction.on_commit(lambda: invalidate_cart_ids(cart_ids))
+    return Counter({CartItem._meta.label: deleted})
+
+
+def recalculate_cart_totals(carts):
+    # Rebuild item_count and subtotal from the real items in a single UPDATE
+    items = CartItem.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+    return carts.update(
+        item_count=Coalesce(Subquery(items.annotate(total=Sum("quantity")).values("total")), 0),
+        subtotal=Coalesce(
+            Subquery(items.annotate(total=Sum(F("quantity") * F("product__price"))).values("total")),
+            Decimal("0.00"),
+        ),
+    )
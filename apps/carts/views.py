@@ -1,14 +1,26 @@
-from django.http import Http404
-from drf_spectacular.utils import OpenApiExample, extend_schema
-from rest_framework import status
+import asyncio
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views import View
+
+from asgiref.sync import sync_to_async
+from drf_spectacular.utils import OpenApiExample, extend_schema, inline_serializer
+from rest_framework import serializers, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 
+from apps.users.authentication import StatelessJWTAuthentication
 from apps.users.serializers import ErrorResponseSerializer, SuccessResponseSerializer
 
+from .events import cart_channel, create_stream_ticket, get_broker, redeem_stream_ticket
 from .models import Cart, CartItem
-from .serializers import CartItemSerializer, CartSerializer
+from .serializers import CartItemSerializer, CartSerializer, CartSummarySerializer
+from .utils import get_cart_snapshot, get_cart_version, release_cart_items
 
 
 class CartView(APIView):
@@ -19,8 +31,9 @@ class CartView(APIView):
 
     @extend_schema(
         tags=["Carts"],
-        description="Retrieve the current user's shopping cart",
-        responses={200: CartSerializer},
+        description="Retrieve the current user's shopping cart. "
+        "Send the returned ETag in `If-None-Match` to get a 304 while the cart is unchanged.",
+        responses={200: CartSerializer, 304: None},
         examples=[
             OpenApiExample(
                 "Cart Response Example",
@@ -45,8 +58,15 @@ class CartView(APIView):
     )
     def get(self, request):
         cart = self.get_cart(request.user)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        version = get_cart_version(cart.pk)
+        headers = {"ETag": f'"{cart.pk}-{version}"', "Cache-Control": "private, no-cache"}
+
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if headers["ETag"] in etags or "*" in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        data = get_cart_snapshot(cart, version)
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
 
     @extend_schema(
         tags=["Carts"],
@@ -64,15 +84,31 @@ class CartView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CartSummaryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Carts"],
+        description="Get the number of items and the subtotal of the current user's cart without loading its items",
+        responses={200: CartSummarySerializer},
+        examples=[OpenApiExample("Cart Summary Response", value={"item_count": 3, "subtotal": "299.97"})],
+    )
+    def get(self, request):
+        summary = Cart.objects.filter(user=request.user).values("item_count", "subtotal").first()
+        serializer = CartSummarySerializer(summary or Cart())
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class CartDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get_cart(self, user):
         return Cart.objects.get(user=user)
 
-    def get_object_by_slug(self, product_slug, user):
+    def get_object_by_slug(self, product_slug, user, for_update=False):
+        queryset = CartItem.objects.select_for_update() if for_update else CartItem.objects
         try:
-            return CartItem.objects.get(product__slug=product_slug, cart__user=user)
+            return queryset.get(product__slug=product_slug, cart__user=user)
         except CartItem.DoesNotExist:
             raise Http404
 
@@ -95,7 +131,6 @@ class CartDetailView(APIView):
         examples=[OpenApiExample("Update Cart Item Request", value={"quantity": 3})],
     )
     def put(self, request, product_slug=None):
-        cart_item = self.get_object_by_slug(product_slug, request.user)
         quantity_change = request.data.get("quantity")
         if quantity_change is None or quantity_change <= 0:
             return Response(
@@ -103,8 +138,11 @@ class CartDetailView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        cart_item.quantity = quantity_change
-        cart_item.save()
+        with transaction.atomic():
+            cart_item = self.get_object_by_slug(product_slug, request.user, for_update=True)
+            cart_item.quantity = quantity_change
+            if not cart_item.reserve_and_save(quantity_change):
+                return Response({"error": "Not enough stock available."}, status=status.HTTP_400_BAD_REQUEST)
         serializer = CartItemSerializer(cart_item)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -114,8 +152,10 @@ class CartDetailView(APIView):
         responses={204: SuccessResponseSerializer, 404: ErrorResponseSerializer},
     )
     def delete(self, request, product_slug=None):
-        cart_item = self.get_object_by_slug(product_slug, request.user)
-        cart_item.delete()
+        with transaction.atomic():
+            # Locked, so that no reservation is taken on the item between loading and deleting it
+            cart_item = self.get_object_by_slug(product_slug, request.user, for_update=True)
+            cart_item.delete()
         return Response({"message": "Item removed from cart."}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -127,5 +167,77 @@ class ClearCartView(APIView):
     )
     def delete(self, request):
         cart = Cart.objects.get(user=request.user)
-        cart.cart_items.all().delete()
+        with transaction.atomic():
+            release_cart_items(cart.cart_items.all())
+            cart.cart_items.all().delete()
         return Response({"message": "Cart cleared."}, status=status.HTTP_204_NO_CONTENT)
+
+
+class CartEventsTicketView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Carts"],
+        description="Get a single-use ticket for the cart events stream, valid for a few seconds. "
+        "Open the stream with `?ticket=<ticket>`; EventSource cannot send the access token in a header.",
+        request=None,
+        responses={
+            201: inline_serializer(
+                "CartEventsTicketResponse",
+                {"ticket": serializers.CharField(), "expires_in": serializers.IntegerField()},
+            )
+        },
+    )
+    def post(self, request):
+        ticket = create_stream_ticket(request.user.pk)
+        return Response(
+            {"ticket": ticket, "expires_in": settings.CART_EVENTS_TICKET_TIMEOUT}, status=status.HTTP_201_CREATED
+        )
+
+
+class CartEventsView(View):
+    """
+    Server-sent events stream of changes to the current user's cart. Each event carries the new cart
+    version, matching the ETag of CartView, so clients refetch only when it differs from what they hold.
+
+    This is an async view: serve the project through config.asgi so idle streams do not hold threads.
+    EventSource cannot set headers, so browsers pass a ticket from CartEventsTicketView as the ``ticket``
+    query parameter instead of the access token.
+    """
+
+    async def get(self, request):
+        user_id = await sync_to_async(self.authenticate)(request)
+        if user_id is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        cart, _ = await Cart.objects.aget_or_create(user_id=user_id)
+        response = StreamingHttpResponse(self.stream(cart.pk), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # Stop nginx from buffering the stream
+        return response
+
+    def authenticate(self, request):
+        if ticket := request.GET.get("ticket"):
+            return redeem_stream_ticket(ticket)
+        authentication = StatelessJWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if not raw_token:
+            return None
+        try:
+            return authentication.get_user(authentication.get_validated_token(raw_token)).pk
+        except (AuthenticationFailed, InvalidToken):
+            return None
+
+    async def stream(self, cart_id):
+        async with get_broker().subscribe(cart_channel(cart_id)) as queue:
+            # Read the version only once subscribed, so no change can slip in between
+            version = await sync_to_async(get_cart_version)(cart_id)
+            yield f'event: cart\ndata: {{"version": {version}}}\n\n'
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.CART_EVENTS_HEARTBEAT)
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: cart\ndata: {message}\n\n"
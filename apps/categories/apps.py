@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CategoriesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.categories"
+
+    def ready(self):
+        from . import cache  # noqa: F401
@@ -0,0 +1,12 @@
+from apps.media.images import image_metadata_updated
+from config.cache import ReferenceCache
+
+from .models import ProductCategory, RoomCategory
+from .serializers import ProductCategorySerializer, RoomCategorySerializer
+
+room_categories = ReferenceCache("room_categories", RoomCategory, RoomCategorySerializer)
+product_categories = ReferenceCache("product_categories", ProductCategory, ProductCategorySerializer)
+
+# Metadata is written with queryset.update(), which the caches do not see
+image_metadata_updated.connect(room_categories.invalidate, sender=RoomCategory, weak=False)
+image_metadata_updated.connect(product_categories.invalidate, sender=ProductCategory, weak=False)
@@ -1,7 +1,9 @@
 from django.db import models
 
+from apps.media.models import ImageMetadataModel
 
-class RoomCategory(models.Model):
+
+class RoomCategory(ImageMetadataModel):
     name = models.CharField(max_length=255)
     image = models.ImageField(upload_to="images/room_categories/", null=True, blank=True)
     slug = models.SlugField(unique=True, blank=True)
@@ -16,7 +18,7 @@ class RoomCategory(models.Model):
         return self.name
 
 
-class ProductCategory(models.Model):
+class ProductCategory(ImageMetadataModel):
     name = models.CharField(max_length=255)
     image = models.ImageField(upload_to="images/product_categories/", null=True, blank=True)
     slug = models.SlugField(unique=True, blank=True)
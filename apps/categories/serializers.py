@@ -1,13 +1,15 @@
 from django.utils.text import slugify
 from rest_framework import serializers
 
+from apps.products.rollups import ProductRollupMixin
+
 from .models import ProductCategory, RoomCategory
 
 
-class RoomCategorySerializer(serializers.ModelSerializer):
+class RoomCategorySerializer(ProductRollupMixin, serializers.ModelSerializer):
     class Meta:
         model = RoomCategory
-        fields = ["name", "image", "slug"]
+        fields = ["name", "image", "image_width", "image_height", "image_color", "image_placeholder", "slug"]
         read_only_fields = ["slug", "created_at", "updated_at"]
 
     def validate(self, data):
@@ -26,16 +28,13 @@ class RoomCategorySerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         if "name" in validated_data:
             validated_data["slug"] = slugify(validated_data["name"])
-        if "image" in validated_data:
-            if instance.image:
-                instance.image.delete(save=False)
         return super().update(instance, validated_data)
 
 
-class ProductCategorySerializer(serializers.ModelSerializer):
+class ProductCategorySerializer(ProductRollupMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
-        fields = ["name", "image", "slug"]
+        fields = ["name", "image", "image_width", "image_height", "image_color", "image_placeholder", "slug"]
         read_only_fields = ["slug", "created_at", "updated_at"]
 
     def validate(self, data):
@@ -54,7 +53,4 @@ class ProductCategorySerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         if "name" in validated_data:
             validated_data["slug"] = slugify(validated_data["name"])
-        if "image" in validated_data:
-            if instance.image:
-                instance.image.delete(save=False)
         return super().update(instance, validated_data)
@@ -5,8 +5,11 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.products.models import ProductRollup
+from apps.products.rollups import PRODUCT_STATS_PARAMETER, product_stats_context
 from apps.users.serializers import ErrorResponseSerializer, SuccessResponseSerializer
 
+from .cache import product_categories, room_categories
 from .models import ProductCategory, RoomCategory
 from .serializers import ProductCategorySerializer, RoomCategorySerializer
 
@@ -17,6 +20,7 @@ class RoomCategoryView(APIView):
     @extend_schema(
         tags=["Room Categories"],
         description="List all room categories",
+        parameters=[PRODUCT_STATS_PARAMETER],
         responses={200: RoomCategorySerializer(many=True)},
         examples=[
             OpenApiExample(
@@ -29,8 +33,10 @@ class RoomCategoryView(APIView):
         ],
     )
     def get(self, request):
-        room_categories = RoomCategory.objects.all()
-        serializer = RoomCategorySerializer(room_categories, many=True)
+        context = product_stats_context(request, ProductRollup.ROOM_CATEGORY)
+        if not context:
+            return Response(room_categories.get().data, status=status.HTTP_200_OK)
+        serializer = RoomCategorySerializer(room_categories.get().by_pk.values(), many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -58,6 +64,7 @@ class RoomCategoryDetailView(APIView):
     @extend_schema(
         tags=["Room Categories"],
         description="Get details of a specific room category by slug",
+        parameters=[PRODUCT_STATS_PARAMETER],
         responses={200: RoomCategorySerializer, 404: ErrorResponseSerializer},
         examples=[
             OpenApiExample(
@@ -68,7 +75,8 @@ class RoomCategoryDetailView(APIView):
     )
     def get(self, request, slug):
         room_category = get_object_or_404(RoomCategory, slug=slug)
-        serializer = RoomCategorySerializer(room_category)
+        context = product_stats_context(request, ProductRollup.ROOM_CATEGORY, [room_category.pk])
+        serializer = RoomCategorySerializer(room_category, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -111,6 +119,7 @@ class ProductCategoryView(APIView):
     @extend_schema(
         tags=["Product Categories"],
         description="List all product categories",
+        parameters=[PRODUCT_STATS_PARAMETER],
         responses={200: ProductCategorySerializer(many=True)},
         examples=[
             OpenApiExample(
@@ -123,8 +132,10 @@ class ProductCategoryView(APIView):
         ],
     )
     def get(self, request):
-        product_categories = ProductCategory.objects.all()
-        serializer = ProductCategorySerializer(product_categories, many=True)
+        context = product_stats_context(request, ProductRollup.PRODUCT_CATEGORY)
+        if not context:
+            return Response(product_categories.get().data, status=status.HTTP_200_OK)
+        serializer = ProductCategorySerializer(product_categories.get().by_pk.values(), many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -152,6 +163,7 @@ class ProductCategoryDetailView(APIView):
     @extend_schema(
         tags=["Product Categories"],
         description="Get details of a specific product category by slug",
+        parameters=[PRODUCT_STATS_PARAMETER],
         responses={200: ProductCategorySerializer, 404: ErrorResponseSerializer},
         examples=[
             OpenApiExample(
@@ -162,7 +174,8 @@ class ProductCategoryDetailView(APIView):
     )
     def get(self, request, slug):
         product_category = get_object_or_404(ProductCategory, slug=slug)
-        serializer = ProductCategorySerializer(product_category)
+        context = product_stats_context(request, ProductRollup.PRODUCT_CATEGORY, [product_category.pk])
+        serializer = ProductCategorySerializer(product_category, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
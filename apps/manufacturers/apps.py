@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ManufacturersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.manufacturers"
+
+    def ready(self):
+        from . import cache  # noqa: F401
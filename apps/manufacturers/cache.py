@@ -0,0 +1,10 @@
+from apps.media.images import image_metadata_updated
+from config.cache import ReferenceCache
+
+from .models import Manufacturer
+from .serializers import ManufacturerSerializer
+
+manufacturers = ReferenceCache("manufacturers", Manufacturer, ManufacturerSerializer)
+
+# Metadata is written with queryset.update(), which the caches do not see
+image_metadata_updated.connect(manufacturers.invalidate, sender=Manufacturer, weak=False)
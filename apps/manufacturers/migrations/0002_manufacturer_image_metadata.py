@@ -0,0 +1,38 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("manufacturers", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="manufacturer",
+            name="image_color",
+            field=models.CharField(blank=True, editable=False, max_length=7),
+        ),
+        migrations.AddField(
+            model_name="manufacturer",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="manufacturer",
+            name="image_metadata_for",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="manufacturer",
+            name="image_placeholder",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="manufacturer",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
 
+from apps.media.models import ImageMetadataModel
 
-class Manufacturer(models.Model):
+
+class Manufacturer(ImageMetadataModel):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to="images/manufacturers/", blank=True, null=True)
@@ -1,13 +1,24 @@
 from django.utils.text import slugify
 from rest_framework import serializers
 
+from apps.products.rollups import ProductRollupMixin
+
 from .models import Manufacturer
 
 
-class ManufacturerSerializer(serializers.ModelSerializer):
+class ManufacturerSerializer(ProductRollupMixin, serializers.ModelSerializer):
     class Meta:
         model = Manufacturer
-        fields = ["name", "description", "image", "slug"]
+        fields = [
+            "name",
+            "description",
+            "image",
+            "image_width",
+            "image_height",
+            "image_color",
+            "image_placeholder",
+            "slug",
+        ]
         read_only_fields = ["slug", "created_at", "updated_at"]
 
     def validate(self, data):
@@ -29,7 +40,4 @@ class ManufacturerSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         if "name" in validated_data:
             validated_data["slug"] = slugify(validated_data["name"])
-        if "image" in validated_data:
-            if instance.image:
-                instance.image.delete(save=False)
         return super().update(instance, validated_data)
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from apps.categories.models import ProductCategory, RoomCategory
+from apps.products.models import Product
+from apps.users.models import User
+
+from .models import Manufacturer
+from .views import ManufacturerProductsPagination
+
+
+class ManufacturerProductsPaginationTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(email="buyer@example.com", password="password"))
+        self.manufacturer = Manufacturer.objects.create(name="Maker", slug="maker")
+        room_category = RoomCategory.objects.create(name="Room", slug="room")
+        product_category = ProductCategory.objects.create(name="Category", slug="category")
+        for i in range(30):
+            Product.objects.create(
+                title=f"Product {i}",
+                description="Description",
+                color="Grey",
+                material="Wood",
+                price=10,
+                rating=4.5,
+                room_category=room_category,
+                product_category=product_category,
+                manufacturer=self.manufacturer,
+                slug=f"product-{i}",
+            )
+        # Every sort value is shared by all of the products
+        Product.objects.update(created_at=timezone.now())
+
+    def walk(self, url, link):
+        slugs = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            slugs.extend(product["slug"] for product in response.data["results"])
+            url = response.data[link]
+        return slugs
+
+    # Far below the ties, so that any fallback to an offset within them would show
+    @mock.patch.object(ManufacturerProductsPagination, "offset_cutoff", 3)
+    def test_pages_through_ties_once_each_way(self):
+        url = reverse("manufacturer-products", args=[self.manufacturer.slug])
+        for sort in ManufacturerProductsPagination.SORTS:
+            with self.subTest(sort=sort):
+                forward = self.walk(f"{url}?sort={sort}&page_size=7", "next")
+                self.assertEqual(len(forward), 30)
+                self.assertEqual(len(set(forward)), 30)
+
+                last_page = self.client.get(f"{url}?sort={sort}&page_size=7")
+                while last_page.data["next"]:
+                    last_page = self.client.get(last_page.data["next"])
+                backward = self.walk(last_page.data["previous"], "previous")
+                self.assertEqual(len(backward), 30 - len(last_page.data["results"]))
+                self.assertEqual(len(set(backward)), len(backward))
+
+    def test_malformed_cursor_is_not_found(self):
+        url = reverse("manufacturer-products", args=[self.manufacturer.slug])
+        response = self.client.get(f"{url}?sort=newest&cursor=cD1ub3QtYS1jdXJzb3I=")
+        self.assertEqual(response.status_code, 404)
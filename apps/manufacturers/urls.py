@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import ManufacturerDetailView, ManufacturerView
+from .views import ManufacturerDetailView, ManufacturerProductsView, ManufacturerView
 
 urlpatterns = [
     path("", ManufacturerView.as_view(), name="manufacturer-list"),
     path("<slug:slug>", ManufacturerDetailView.as_view(), name="manufacturer-detail"),
+    path("<slug:slug>/products", ManufacturerProductsView.as_view(), name="manufacturer-products"),
 ]
@@ -1,12 +1,18 @@
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import OpenApiExample, extend_schema
-from rest_framework import status
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema, inline_serializer
+from rest_framework import serializers, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.products.models import Product, ProductRollup
+from apps.products.rollups import PRODUCT_STATS_PARAMETER, product_stats_context
+from apps.products.serializers import ProductSerializer
 from apps.users.serializers import ErrorResponseSerializer, SuccessResponseSerializer
+from config.pagination import KeysetCursorPagination
 
+from .cache import manufacturers
 from .models import Manufacturer
 from .serializers import ManufacturerSerializer
 
@@ -17,6 +23,7 @@ class ManufacturerView(APIView):
     @extend_schema(
         tags=["Manufacturers"],
         description="List all furniture manufacturers",
+        parameters=[PRODUCT_STATS_PARAMETER],
         responses={200: ManufacturerSerializer(many=True)},
         examples=[
             OpenApiExample(
@@ -39,8 +46,10 @@ class ManufacturerView(APIView):
         ],
     )
     def get(self, request):
-        room_categories = Manufacturer.objects.all()
-        serializer = ManufacturerSerializer(room_categories, many=True)
+        context = product_stats_context(request, ProductRollup.MANUFACTURER)
+        if not context:
+            return Response(manufacturers.get().data, status=status.HTTP_200_OK)
+        serializer = ManufacturerSerializer(manufacturers.get().by_pk.values(), many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -73,6 +82,7 @@ class ManufacturerDetailView(APIView):
     @extend_schema(
         tags=["Manufacturers"],
         description="Get details of a specific manufacturer by slug",
+        parameters=[PRODUCT_STATS_PARAMETER],
         responses={200: ManufacturerSerializer, 404: ErrorResponseSerializer},
         examples=[
             OpenApiExample(
@@ -87,8 +97,9 @@ class ManufacturerDetailView(APIView):
         ],
     )
     def get(self, request, slug):
-        room_category = get_object_or_404(Manufacturer, slug=slug)
-        serializer = ManufacturerSerializer(room_category)
+        manufacturer = get_object_or_404(Manufacturer, slug=slug)
+        context = product_stats_context(request, ProductRollup.MANUFACTURER, [manufacturer.pk])
+        serializer = ManufacturerSerializer(manufacturer, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -123,3 +134,75 @@ class ManufacturerDetailView(APIView):
             {"message": "Manufacturer deleted successfully."},
             status=status.HTTP_204_NO_CONTENT,
         )
+
+
+class ManufacturerProductsPagination(KeysetCursorPagination):
+    # Each sort is served by a (manufacturer, sort field, id) index on Product
+    SORTS = {
+        "newest": ("-created_at", "-pk"),
+        "price": ("price", "pk"),
+        "-price": ("-price", "-pk"),
+        "rating": ("-rating", "-pk"),
+    }
+    ordering = SORTS["newest"]
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        return self.SORTS[request.query_params.get("sort", "newest")]
+
+
+class ManufacturerProductsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Manufacturers"],
+        description="Get a manufacturer with its products, sorted and cursor paginated",
+        parameters=[
+            OpenApiParameter(
+                name="sort",
+                description="Sort order of the products",
+                type=OpenApiTypes.STR,
+                required=False,
+                enum=list(ManufacturerProductsPagination.SORTS),
+            ),
+            OpenApiParameter(name="cursor", type=OpenApiTypes.STR, required=False),
+            OpenApiParameter(name="page_size", type=OpenApiTypes.INT, required=False),
+        ],
+        responses={
+            200: inline_serializer(
+                "ManufacturerProductsResponse",
+                {
+                    "manufacturer": ManufacturerSerializer(),
+                    "next": serializers.URLField(allow_null=True),
+                    "previous": serializers.URLField(allow_null=True),
+                    "results": ProductSerializer(many=True),
+                },
+            ),
+            400: ErrorResponseSerializer,
+            404: ErrorResponseSerializer,
+        },
+    )
+    def get(self, request, slug):
+        manufacturer = manufacturers.get().by_slug.get(slug)
+        if manufacturer is None:
+            return Response({"detail": "No Manufacturer matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+        if request.query_params.get("sort", "newest") not in ManufacturerProductsPagination.SORTS:
+            return Response(
+                {"error": f"sort must be one of: {', '.join(ManufacturerProductsPagination.SORTS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        products = Product.objects.filter(manufacturer_id=manufacturer.pk).prefetch_related("images")
+        paginator = ManufacturerProductsPagination()
+        page = paginator.paginate_queryset(products, request, view=self)
+        return Response(
+            {
+                "manufacturer": ManufacturerSerializer(manufacturer).data,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+                "results": ProductSerializer(page, many=True, context={"request": request}).data,
+            },
+            status=status.HTTP_200_OK,
+        )
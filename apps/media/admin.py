@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import MediaBlob
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "ref_count", "unreferenced_at", "created_at")
+    search_fields = ("=name",)
+    list_filter = ("created_at",)
+    ordering = ("-created_at",)
+    readonly_fields = ("name", "size", "ref_count", "unreferenced_at", "created_at")
+    show_full_result_count = False
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class MediaConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.media"
+
+    def ready(self):
+        from . import signals
+
+        signals.connect_receivers()
@@ -0,0 +1,119 @@
+import base64
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.db import close_old_connections, models
+from django.dispatch import Signal
+
+from PIL import ExifTags, Image, ImageFilter, ImageOps
+
+from .models import ImageMetadataModel
+
+logger = logging.getLogger(__name__)
+
+# Photos are decoded at roughly this size; plenty for the colour and the placeholder
+SAMPLE_SIZE = 64
+PLACEHOLDER_SIZE = 16
+PALETTE_COLORS = 8
+# Orientations that turn the stored image by 90 degrees, swapping its displayed width and height
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+# Stored for files that cannot be read, so they are not retried on every run
+EMPTY_METADATA = {"image_width": None, "image_height": None, "image_color": "", "image_placeholder": ""}
+METADATA_WORKERS = 2
+
+# Sent by save_image_metadata(), which writes with queryset.update() and so sends no post_save.
+# Arguments: pks (the rows that were updated).
+image_metadata_updated = Signal()
+
+_executor = ThreadPoolExecutor(max_workers=METADATA_WORKERS, thread_name_prefix="image-metadata")
+
+
+def get_metadata_models():
+    return [model for model in apps.get_models() if issubclass(model, ImageMetadataModel)]
+
+
+def pending_images(model):
+    """
+    Rows with an image whose metadata was not computed yet, or was computed for a previous image.
+    """
+    return (
+        model._base_manager.filter(image__isnull=False).exclude(image="").exclude(image_metadata_for=models.F("image"))
+    )
+
+
+def compute_image_metadata(file):
+    """
+    Width and height as displayed, dominant colour and a blurred placeholder as a data: URI.
+    """
+    with Image.open(file) as image:
+        width, height = image.size
+        if image.getexif().get(ExifTags.Base.Orientation) in ROTATED_ORIENTATIONS:
+            width, height = height, width
+        # JPEGs are decoded straight at a fraction of their size, which is most of the cost on large photos
+        image.draft("RGB", (SAMPLE_SIZE, SAMPLE_SIZE))
+        sample = ImageOps.exif_transpose(image)
+        sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+
+    # Transparent areas are shown over the page background, assumed white
+    background = Image.new("RGBA", sample.size, "white")
+    background.alpha_composite(sample.convert("RGBA"))
+    sample = background.convert("RGB")
+
+    # The most common colour of a small palette, rather than the mean, which muddies two-tone images
+    paletted = sample.quantize(colors=PALETTE_COLORS)
+    _, index = max(paletted.getcolors())
+    red, green, blue = paletted.getpalette()[index * 3 : index * 3 + 3]
+
+    sample.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    sample.filter(ImageFilter.GaussianBlur(1)).save(buffer, "JPEG", quality=60, optimize=True)
+    return {
+        "image_width": width,
+        "image_height": height,
+        "image_color": f"#{red:02x}{green:02x}{blue:02x}",
+        "image_placeholder": f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode()}",
+    }
+
+
+def read_image_metadata(model, name):
+    try:
+        with model._meta.get_field("image").storage.open(name) as file:
+            return compute_image_metadata(file)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Failed to read the metadata of %s image %s", model._meta.label, name, exc_info=True)
+        return EMPTY_METADATA
+
+
+def save_image_metadata(model, results):
+    """
+    Store (pk, name, metadata) results. A row whose image was replaced meanwhile is skipped; the save that
+    replaced it scheduled its own computation. Returns the number of rows updated.
+    """
+    pks = [
+        pk
+        for pk, name, metadata in results
+        if model._base_manager.filter(pk=pk, image=name).update(image_metadata_for=name, **metadata)
+    ]
+    if pks:
+        image_metadata_updated.send(sender=model, pks=pks)
+    return len(pks)
+
+
+def update_image_metadata(model, pk, name):
+    try:
+        save_image_metadata(model, [(pk, name, read_image_metadata(model, name))])
+    except Exception:
+        # Left pending for backfill_image_metadata
+        logger.exception("Failed to update the metadata of %s image %s", model._meta.label, name)
+    finally:
+        close_old_connections()
+
+
+def schedule_image_metadata(model, pk, name):
+    """
+    Compute the metadata in a background thread of this process, so that the upload request does not wait
+    for the image to be decoded. Work lost to a restart is picked up by backfill_image_metadata.
+    """
+    _executor.submit(update_image_metadata, model, pk, name)
@@ -0,0 +1,52 @@
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from apps.media.images import get_metadata_models, pending_images, read_image_metadata, save_image_metadata
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the dimensions, dominant colour and placeholder of images that do not have them yet, "
+        "or whose image changed since. With --recompute, redo every image."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recompute", action="store_true", help="Recompute the metadata of every image.")
+        parser.add_argument("--workers", type=int, default=4, help="Threads decoding images in parallel.")
+        parser.add_argument("--batch-size", type=int, default=100, help="Images read per batch.")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        updated = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for model in get_metadata_models():
+                if options["recompute"]:
+                    queryset = model._base_manager.filter(image__isnull=False).exclude(image="")
+                else:
+                    queryset = pending_images(model)
+                last_pk = 0
+                while True:
+                    rows = list(
+                        queryset.filter(pk__gt=last_pk)
+                        .order_by("pk")
+                        .values_list("pk", "image")[: options["batch_size"]]
+                    )
+                    if not rows:
+                        break
+                    last_pk = rows[-1][0]
+                    # Pillow releases the GIL while decoding, so the threads run on separate cores
+                    metadata = executor.map(functools.partial(read_image_metadata, model), [name for _, name in rows])
+                    updated += save_image_metadata(
+                        model,
+                        [(pk, name, row_metadata) for (pk, name), row_metadata in zip(rows, metadata, strict=True)],
+                    )
+                    if options["pause"]:
+                        time.sleep(options["pause"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated the metadata of {updated} images in {time.monotonic() - started:.2f}s.")
+        )
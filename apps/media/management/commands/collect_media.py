@@ -0,0 +1,105 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.media.models import MediaBlob
+from apps.media.storage import BLOB_PREFIX, ContentAddressedStorage
+from apps.media.utils import count_references
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the files of media blobs that have had no references for longer than --hours. "
+        "With --recount, first recompute every reference count from the file fields and register stray files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24, help="Keep unreferenced blobs for this many hours.")
+        parser.add_argument("--recount", action="store_true", help="Recompute reference counts before collecting.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Blobs checked per batch.")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not ContentAddressedStorage.")
+        started = time.monotonic()
+        if options["recount"]:
+            self.recount()
+
+        collected = freed = 0
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        last_pk = 0
+        while True:
+            blobs = list(
+                MediaBlob.objects.filter(ref_count=0, unreferenced_at__lt=cutoff, pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", "name")[: options["batch_size"]]
+            )
+            if not blobs:
+                break
+            last_pk = blobs[-1][0]
+            # Rows written without signals (queryset.update(), raw SQL) are not counted; never delete a file
+            # that a row still points at
+            references = count_references([name for _, name in blobs])
+            for pk, name in blobs:
+                with transaction.atomic():
+                    # The row lock makes an upload of the same content wait until the file is gone, after which
+                    # it writes the file again
+                    blob = MediaBlob.objects.select_for_update().filter(pk=pk, ref_count=0).first()
+                    if blob is None:
+                        continue
+                    if references[name]:
+                        MediaBlob.objects.filter(pk=pk).update(ref_count=references[name], unreferenced_at=None)
+                        continue
+                    blob.delete()
+                    default_storage.purge(name)
+                collected += 1
+                freed += blob.size
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {collected} unreferenced files ({freed / 1024 / 1024:.1f} MiB) "
+                f"in {time.monotonic() - started:.2f}s."
+            )
+        )
+
+    def recount(self):
+        references = count_references()
+        now = timezone.now()
+        changed = []
+        for blob in MediaBlob.objects.iterator():
+            ref_count = references.pop(blob.name, 0)
+            if blob.ref_count != ref_count:
+                blob.ref_count = ref_count
+                blob.unreferenced_at = None if ref_count else now
+                changed.append(blob)
+        MediaBlob.objects.bulk_update(changed, ["ref_count", "unreferenced_at"], batch_size=500)
+
+        # Files left behind by uploads whose transaction rolled back, and referenced files without a row
+        registered = set(MediaBlob.objects.values_list("name", flat=True))
+        missing = []
+        for directory, _, files in os.walk(default_storage.path(BLOB_PREFIX)):
+            for file_name in files:
+                if file_name.startswith(".upload-"):
+                    continue
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, default_storage.location).replace(os.sep, "/")
+                if name not in registered:
+                    ref_count = references.get(name, 0)
+                    missing.append(
+                        MediaBlob(
+                            name=name,
+                            size=os.path.getsize(path),
+                            ref_count=ref_count,
+                            unreferenced_at=None if ref_count else now,
+                        )
+                    )
+        MediaBlob.objects.bulk_create(missing, batch_size=500, ignore_conflicts=True)
+        self.stdout.write(f"Corrected {len(changed)} reference counts and registered {len(missing)} files.")
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("unreferenced_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Media Blob",
+                "verbose_name_plural": "Media Blobs",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("ref_count", 0)),
+                        fields=["unreferenced_at"],
+                        name="media_blob_unreferenced_idx",
+                    )
+                ],
+            },
+        ),
+    ]
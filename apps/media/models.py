@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class MediaBlob(models.Model):
+    """
+    A file of ContentAddressedStorage, shared by every upload with the same content. ref_count is kept up to
+    date by the storage and apps/media/signals.py; files are only removed by the collect_media command, once
+    they have been unreferenced for a while.
+    """
+
+    name = models.CharField(max_length=255, unique=True)  # Storage name, blobs/<sha256 prefix>/<sha256><ext>
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    unreferenced_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Media Blob"
+        verbose_name_plural = "Media Blobs"
+        indexes = [
+            models.Index(
+                fields=["unreferenced_at"], condition=models.Q(ref_count=0), name="media_blob_unreferenced_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
+class ImageMetadataModel(models.Model):
+    """
+    Dimensions, dominant colour and a tiny blurred placeholder of the model's `image`, computed by
+    apps/media/images.py after the image is saved. image_metadata_for is the image name they describe, so
+    a row whose image changed since (or that was never processed) is picked up by backfill_image_metadata.
+    """
+
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_color = models.CharField(max_length=7, blank=True, editable=False)  # "#rrggbb"
+    image_placeholder = models.TextField(blank=True, editable=False)  # data: URI of a ~16px blurred JPEG
+    image_metadata_for = models.CharField(max_length=255, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
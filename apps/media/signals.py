@@ -0,0 +1,95 @@
+import functools
+
+from django.db import transaction
+from django.db.models.fields.files import FieldFile, ImageFieldFile
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .images import EMPTY_METADATA, get_metadata_models, schedule_image_metadata
+from .utils import get_file_fields
+
+UPLOADED_FIELDS_ATTR = "_uploaded_file_fields"
+
+
+class UploadTrackingMixin:
+    """
+    Remembers on the instance that a file was stored for the field. Every upload takes a reference, even one
+    that stores the content the field already had and so keeps its name; release_replaced_files() needs to
+    know about it to drop the reference of the previous file.
+    """
+
+    def save(self, name, content, save=True):
+        super().save(name, content, save=False)
+        self.instance.__dict__.setdefault(UPLOADED_FIELDS_ATTR, set()).add(self.field.attname)
+        if save:
+            self.instance.save()
+
+
+class TrackedFieldFile(UploadTrackingMixin, FieldFile):
+    pass
+
+
+class TrackedImageFieldFile(UploadTrackingMixin, ImageFieldFile):
+    pass
+
+
+def release_replaced_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    fields = [
+        field
+        for model, field in get_file_fields()
+        if model is sender and (update_fields is None or field.name in update_fields)
+    ]
+    if not fields:
+        return
+    uploaded = instance.__dict__.get(UPLOADED_FIELDS_ATTR, set())
+    previous = sender._base_manager.filter(pk=instance.pk).values(*(field.attname for field in fields)).first()
+    for field in fields:
+        old_name = previous and previous[field.attname]
+        file = getattr(instance, field.attname)
+        # A file that is not committed yet is stored by this save, taking its own reference
+        replaced = field.attname in uploaded or not file._committed or old_name != file.name
+        if old_name and replaced:
+            transaction.on_commit(functools.partial(field.storage.delete, old_name))
+
+
+def forget_uploads(sender, instance, raw=False, **kwargs):
+    # The references of the uploads are held by the saved row from now on
+    instance.__dict__.pop(UPLOADED_FIELDS_ATTR, None)
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    for model, field in get_file_fields():
+        name = getattr(instance, field.attname).name if model is sender else None
+        if name:
+            transaction.on_commit(functools.partial(field.storage.delete, name))
+
+
+def clear_replaced_image_metadata(sender, instance, raw=False, **kwargs):
+    # Metadata of the previous image would give the new one the wrong size until it is recomputed
+    if not raw and instance.image_metadata_for and instance.image.name != instance.image_metadata_for:
+        for attname, value in EMPTY_METADATA.items():
+            setattr(instance, attname, value)
+        instance.image_metadata_for = ""
+
+
+def image_saved(sender, instance, raw=False, **kwargs):
+    name = instance.image.name
+    if not raw and name and name != instance.image_metadata_for:
+        transaction.on_commit(functools.partial(schedule_image_metadata, sender, instance.pk, name))
+
+
+def connect_receivers():
+    # Only models with a file field in ContentAddressedStorage pay for the extra lookup on save
+    for model, field in get_file_fields():
+        if not issubclass(field.attr_class, UploadTrackingMixin):
+            field.attr_class = (
+                TrackedImageFieldFile if issubclass(field.attr_class, ImageFieldFile) else TrackedFieldFile
+            )
+        # Connecting the same receiver again for a model with several file fields is a no-op
+        pre_save.connect(release_replaced_files, sender=model)
+        post_save.connect(forget_uploads, sender=model)
+        post_delete.connect(release_deleted_files, sender=model)
+    for model in get_metadata_models():
+        pre_save.connect(clear_replaced_image_metadata, sender=model)
+        post_save.connect(image_saved, sender=model)
@@ -0,0 +1,85 @@
+import contextlib
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import MediaBlob
+
+BLOB_PREFIX = "blobs"
+
+
+def is_blob_name(name):
+    return name.startswith(f"{BLOB_PREFIX}/")
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under the SHA-256 of its content, so uploading a file that is already stored only adds
+    a reference to its MediaBlob. Deleting drops a reference; the file itself is removed later by the
+    collect_media command. Files saved before this storage was introduced keep their names and are deleted
+    right away, as they were never shared.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The name is derived from the content in _save(), so the upload_to name never needs to be unique
+        return name
+
+    def blob_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def _save(self, name, content):
+        name = self.blob_name(name, content)
+        # Take the reference before checking the file: collect_media deletes the row of an unreferenced blob
+        # before its file, so a blob that is being collected is either still referenced here or written again.
+        with transaction.atomic():
+            add_reference = {"ref_count": F("ref_count") + 1, "unreferenced_at": None}
+            if not MediaBlob.objects.filter(name=name).update(**add_reference):
+                MediaBlob.objects.get_or_create(name=name, defaults={"size": content.size})
+                MediaBlob.objects.filter(name=name).update(**add_reference)
+        if not self.exists(name):
+            self._write(name, content)
+        return name
+
+    def _write(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file and rename it, so that concurrent uploads of the same content never
+        # expose a partially written file
+        fd, temporary_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in content.chunks():
+                    file.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+            os.chmod(temporary_path, self.file_permissions_mode or 0o644)
+            os.replace(temporary_path, full_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temporary_path)
+            raise
+
+    def delete(self, name):
+        if not name:
+            return
+        if not is_blob_name(name):
+            super().delete(name)
+            return
+        MediaBlob.objects.filter(name=name).update(
+            ref_count=Greatest(F("ref_count") - 1, 0),
+            unreferenced_at=Case(When(ref_count__lte=1, then=Value(timezone.now())), default=F("unreferenced_at")),
+        )
+
+    def purge(self, name):
+        # Remove the file itself; only collect_media calls this, after deleting the MediaBlob row
+        super().delete(name)
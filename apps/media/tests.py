@@ -0,0 +1,252 @@
+import base64
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from PIL import ExifTags, Image
+
+from apps.users.models import User
+from config.files import parse_range, serve
+
+from .images import compute_image_metadata
+from .models import MediaBlob
+from .utils import count_references
+
+collect_media = "apps.media.management.commands.collect_media"
+
+
+# User has a plain image field; a local cache keeps the signals of its saves off Redis
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.users = [User.objects.create_user(email=f"user{i}@example.com", password="password") for i in range(2)]
+
+    def upload(self, user, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            user.image.save("photo.jpg", ContentFile(content))
+        return user.image.name
+
+    def assertReferences(self, name, ref_count):
+        blob = MediaBlob.objects.get(name=name)
+        self.assertEqual(blob.ref_count, ref_count)
+        self.assertEqual(blob.ref_count, count_references([name])[name])
+        self.assertEqual(blob.unreferenced_at is None, ref_count > 0)
+
+    def collect(self):
+        MediaBlob.objects.filter(ref_count=0).update(unreferenced_at=timezone.now() - timedelta(days=2))
+        call_command("collect_media", pause=0, stdout=StringIO())
+
+    def test_same_content_is_stored_once(self):
+        first, second = (self.upload(user, b"same") for user in self.users)
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith("blobs/"))
+        self.assertReferences(first, 2)
+
+    def test_replacing_releases_the_previous_file(self):
+        old = self.upload(self.users[0], b"old")
+        new = self.upload(self.users[0], b"new")
+        self.assertReferences(old, 0)
+        self.assertReferences(new, 1)
+
+    def test_uploading_the_same_content_again_keeps_one_reference(self):
+        name = self.upload(self.users[0], b"same")
+        self.assertEqual(self.upload(self.users[0], b"same"), name)
+        self.assertReferences(name, 1)
+
+    def test_delete_releases_the_file(self):
+        name = self.upload(self.users[0], b"shared")
+        self.upload(self.users[1], b"shared")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].delete()
+        self.assertReferences(name, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[1].delete()
+        self.assertReferences(name, 0)
+
+    def test_collect_removes_only_unreferenced_files(self):
+        kept = self.upload(self.users[0], b"kept")
+        removed = self.upload(self.users[1], b"removed")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[1].delete()
+        self.collect()
+        self.assertTrue(default_storage.exists(kept))
+        self.assertFalse(default_storage.exists(removed))
+        self.assertFalse(MediaBlob.objects.filter(name=removed).exists())
+
+    def test_upload_while_collecting_keeps_the_file(self):
+        name = self.upload(self.users[0], b"content")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].delete()
+
+        # The upload lands after the blob was picked for collection but before it is locked
+        def upload_then_count(names):
+            self.upload(self.users[1], b"content")
+            return count_references(names)
+
+        with mock.patch(f"{collect_media}.count_references", side_effect=upload_then_count):
+            self.collect()
+        self.assertTrue(default_storage.exists(name))
+        self.assertReferences(name, 1)
+
+    def test_upload_after_collection_stores_the_file_again(self):
+        name = self.upload(self.users[0], b"content")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].delete()
+        self.collect()
+        self.assertFalse(default_storage.exists(name))
+
+        self.assertEqual(self.upload(self.users[1], b"content"), name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertReferences(name, 1)
+
+
+@override_settings(FILE_SERVING="direct")
+class FileServingTests(SimpleTestCase):
+    content = b"0123456789"
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.write("file.txt", self.content)
+
+    def write(self, name, content):
+        with open(os.path.join(self.root, name), "wb") as file:
+            file.write(content)
+
+    def get(self, path="file.txt", **headers):
+        response = serve(RequestFactory().get(f"/media/{path}", headers=headers), path, self.root)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=2-5", 10), (2, 5))
+        self.assertEqual(parse_range("bytes=7-", 10), (7, 9))
+        self.assertEqual(parse_range("bytes=5-100", 10), (5, 9))
+        self.assertEqual(parse_range("bytes=-3", 10), (7, 9))
+        self.assertEqual(parse_range("bytes=-30", 10), (0, 9))
+        for header in ("bytes=-", "bytes=0-1,4-5", "items=0-1", "bytes=a-b"):
+            self.assertIsNone(parse_range(header, 10))
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response["Content-Type"], "text/plain")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+    def test_hashed_names_are_immutable(self):
+        name = f"{'a' * 64}.txt"
+        os.makedirs(os.path.join(self.root, "blobs", "aa", "aa"))
+        self.write(f"blobs/aa/aa/{name}", self.content)
+        response = self.get(f"blobs/aa/aa/{name}")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_range(self):
+        response = self.get(Range="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), b"2345")
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(response["Content-Length"], "4")
+
+        response = self.get(Range="bytes=-3")
+        self.assertEqual(self.body(response), b"789")
+        self.assertEqual(response["Content-Range"], "bytes 7-9/10")
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range="bytes=10-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_range_of_a_changed_file_sends_it_whole(self):
+        response = self.get(Range="bytes=2-5", **{"If-Range": '"outdated"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+
+    def test_precompressed_variant(self):
+        compressed = gzip.compress(self.content)
+        self.write("file.txt.gz", compressed)
+
+        response = self.get(**{"Accept-Encoding": "br, gzip;q=0.8"})
+        self.assertEqual(self.body(response), compressed)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/plain")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+        response = self.get()
+        self.assertEqual(self.body(response), self.content)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_not_modified(self):
+        etag = self.get()["ETag"]
+        response = self.get(**{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        # Each encoding is its own representation
+        self.write("file.txt.gz", gzip.compress(self.content))
+        response = self.get(**{"If-None-Match": etag, "Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_hidden_and_outside_files_are_not_found(self):
+        self.write(".upload-partial", self.content)
+        for path in (".upload-partial", "../file.txt", "missing.txt"):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.get(path)
+
+    @override_settings(FILE_SERVING="x-accel")
+    def test_offloaded_to_nginx(self):
+        response = serve(RequestFactory().get("/media/file.txt"), "file.txt", self.root, "/internal/media/")
+        self.assertEqual(response["X-Accel-Redirect"], "/internal/media/file.txt")
+        self.assertEqual(response.content, b"")
+
+
+class ImageMetadataTests(SimpleTestCase):
+    def image(self, image, orientation=None):
+        exif = Image.Exif()
+        if orientation:
+            exif[ExifTags.Base.Orientation] = orientation
+        file = BytesIO()
+        image.save(file, "PNG", exif=exif)
+        file.seek(0)
+        return file
+
+    def test_rotated_photo(self):
+        # Stored 40x20, three quarters red; orientation 6 displays it turned a quarter, as 20x40
+        image = Image.new("RGB", (40, 20), "red")
+        image.paste((0, 0, 255), (30, 0, 40, 20))
+        metadata = compute_image_metadata(self.image(image, orientation=6))
+        self.assertEqual((metadata["image_width"], metadata["image_height"]), (20, 40))
+        self.assertEqual(metadata["image_color"], "#ff0000")
+
+        prefix = "data:image/jpeg;base64,"
+        self.assertTrue(metadata["image_placeholder"].startswith(prefix))
+        with Image.open(BytesIO(base64.b64decode(metadata["image_placeholder"][len(prefix) :]))) as placeholder:
+            self.assertEqual(placeholder.size, (8, 16))
+
+    def test_unrotated_photo(self):
+        metadata = compute_image_metadata(self.image(Image.new("RGB", (40, 20), "red"), orientation=1))
+        self.assertEqual((metadata["image_width"], metadata["image_height"]), (40, 20))
+
+    def test_transparency_is_shown_over_white(self):
+        image = Image.new("RGBA", (40, 20), (0, 0, 0, 0))
+        image.paste((255, 0, 0, 255), (0, 0, 10, 20))
+        self.assertEqual(compute_image_metadata(self.image(image))["image_color"], "#ffffff")
@@ -0,0 +1,34 @@
+import functools
+from collections import Counter
+
+from django.apps import apps
+from django.db import models
+
+from .storage import ContentAddressedStorage
+
+
+@functools.cache
+def get_file_fields():
+    """
+    (model, field) pairs of every file field stored in ContentAddressedStorage.
+    """
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def count_references(names=None):
+    """
+    Count the rows referencing each stored file, optionally only for the given names.
+    """
+    references = Counter()
+    for model, field in get_file_fields():
+        rows = model._base_manager.exclude(**{field.attname: ""})
+        if names is not None:
+            rows = rows.filter(**{f"{field.attname}__in": names})
+        for row in rows.values(field.attname).annotate(count=models.Count("pk")).order_by():
+            references[row[field.attname]] += row["count"]
+    return references
@@ -1,6 +1,15 @@
-from django.contrib import admin
+from decimal import Decimal
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest, Round
+
+from apps.categories.models import ProductCategory, RoomCategory
 
 from .models import Product, ProductImage
+from .utils import bulk_update_products
 
 
 class ProductImageInline(admin.TabularInline):
@@ -8,11 +17,23 @@ class ProductImageInline(admin.TabularInline):
     extra = 1
 
 
+class ProductActionForm(ActionForm):
+    value = forms.DecimalField(
+        required=False,
+        max_digits=10,
+        decimal_places=2,
+        help_text="Percent, amount or units, negative to lower prices or stock.",
+    )
+    room_category = forms.ModelChoiceField(RoomCategory.objects.all(), required=False)
+    product_category = forms.ModelChoiceField(ProductCategory.objects.all(), required=False)
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = (
         "title",
         "price",
+        "stock",
         "room_category",
         "product_category",
         "manufacturer",
@@ -21,10 +42,93 @@ class ProductAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
     )
-    search_fields = ["title", "room_category", "product_category", "manufacturer"]
-    list_filter = ["manufacturer", "room_category", "product_category"]
+    list_select_related = ["room_category", "product_category", "manufacturer"]
+    search_fields = ["title", "slug", "room_category__name", "product_category__name", "manufacturer__name"]
+    list_filter = ["manufacturer", "room_category", "product_category", "is_ar"]
+    autocomplete_fields = ["room_category", "product_category", "manufacturer"]
+    show_full_result_count = False
     prepopulated_fields = {"slug": ("title",)}
     inlines = [ProductImageInline]
+    action_form = ProductActionForm
+    actions = [
+        "change_price_by_percent",
+        "change_price_by_amount",
+        "change_stock",
+        "move_to_room_category",
+        "move_to_product_category",
+        "enable_ar",
+        "disable_ar",
+    ]
+
+    def get_readonly_fields(self, request, obj=None):
+        # Stock of an existing product changes under concurrent reservations; adjust it with change_stock
+        readonly_fields = super().get_readonly_fields(request, obj)
+        return [*readonly_fields, "stock"] if obj is not None else readonly_fields
+
+    # Every action is one UPDATE through bulk_update_products(), without saving the products one by one
+
+    def get_action_value(self, request, name):
+        form = self.action_form(request.POST)
+        form.fields["action"].choices = self.get_action_choices(request)
+        if not form.is_valid() or form.cleaned_data[name] is None:
+            label = name.replace("_", " ")
+            self.message_user(request, f"Enter a {label} next to the action to apply it.", messages.ERROR)
+            return None
+        return form.cleaned_data[name]
+
+    def update_prices(self, request, queryset, price):
+        # Prices never go below zero, as the product serializer would reject them
+        updated = bulk_update_products(queryset, price=Greatest(Round(price, 2), Value(Decimal("0.00"))))
+        self.message_user(request, f"Changed the price of {updated} products.", messages.SUCCESS)
+
+    @admin.action(description="Change price by percent of selected products")
+    def change_price_by_percent(self, request, queryset):
+        percent = self.get_action_value(request, "value")
+        if percent is not None:
+            self.update_prices(request, queryset, F("price") * Value(1 + percent / 100))
+
+    @admin.action(description="Change price by amount of selected products")
+    def change_price_by_amount(self, request, queryset):
+        amount = self.get_action_value(request, "value")
+        if amount is not None:
+            self.update_prices(request, queryset, F("price") + Value(amount))
+
+    @admin.action(description="Change stock of selected products by units")
+    def change_stock(self, request, queryset):
+        units = self.get_action_value(request, "value")
+        if units is None:
+            return
+        if units != int(units):
+            self.message_user(request, "Enter a whole number of units.", messages.ERROR)
+            return
+        # Relative to the current stock, so reservations made meanwhile are kept; untracked products start at 0
+        stock = Greatest(Coalesce(F("stock"), Value(0)) + Value(int(units)), Value(0))
+        updated = bulk_update_products(queryset, stock=stock)
+        self.message_user(request, f"Changed the stock of {updated} products.", messages.SUCCESS)
+
+    @admin.action(description="Move selected products to room category")
+    def move_to_room_category(self, request, queryset):
+        room_category = self.get_action_value(request, "room_category")
+        if room_category is not None:
+            updated = bulk_update_products(queryset, room_category=room_category)
+            self.message_user(request, f"Moved {updated} products to {room_category}.", messages.SUCCESS)
+
+    @admin.action(description="Move selected products to product category")
+    def move_to_product_category(self, request, queryset):
+        product_category = self.get_action_value(request, "product_category")
+        if product_category is not None:
+            updated = bulk_update_products(queryset, product_category=product_category)
+            self.message_user(request, f"Moved {updated} products to {product_category}.", messages.SUCCESS)
+
+    @admin.action(description="Enable AR for selected products")
+    def enable_ar(self, request, queryset):
+        updated = bulk_update_products(queryset, is_ar=True)
+        self.message_user(request, f"Enabled AR for {updated} products.", messages.SUCCESS)
+
+    @admin.action(description="Disable AR for selected products")
+    def disable_ar(self, request, queryset):
+        updated = bulk_update_products(queryset, is_ar=False)
+        self.message_user(request, f"Disabled AR for {updated} products.", messages.SUCCESS)
 
 
 # @admin.register(ProductImage)
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute product counts and price ranges per category and manufacturer from the Product table."
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        changes = rebuild_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {changes['created']}, updated {changes['updated']} and deleted {changes['deleted']} "
+                f"rollups in {time.monotonic() - started:.2f}s."
+            )
+        )
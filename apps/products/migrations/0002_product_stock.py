@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="stock",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Units available. Leave empty to not track stock.",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("categories", "0001_initial"),
+        ("manufacturers", "0001_initial"),
+        ("products", "0002_product_stock"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("room_category", "Room category"),
+                            ("product_category", "Product category"),
+                            ("manufacturer", "Manufacturer"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("key_id", models.BigIntegerField()),
+                ("product_count", models.PositiveIntegerField(default=0)),
+                (
+                    "min_price",
+                    models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+                ),
+                (
+                    "max_price",
+                    models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+                ),
+            ],
+            options={
+                "verbose_name": "Product Rollup",
+                "verbose_name_plural": "Product Rollups",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["room_category", "price"], name="products_pr_room_ca_32bde6_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["product_category", "price"],
+                name="products_pr_product_c430bf_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["manufacturer", "price"], name="products_pr_manufac_198d93_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="productrollup",
+            constraint=models.UniqueConstraint(fields=("dimension", "key_id"), name="products_rollup_unique"),
+        ),
+    ]
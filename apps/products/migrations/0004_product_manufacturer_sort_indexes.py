@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("categories", "0001_initial"),
+        ("manufacturers", "0001_initial"),
+        ("products", "0003_product_rollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["manufacturer", "created_at"],
+                name="products_pr_manufac_58b8d8_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["manufacturer", "rating"], name="products_pr_manufac_4b914b_idx"),
+        ),
+    ]
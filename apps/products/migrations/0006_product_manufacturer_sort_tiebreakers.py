@@ -0,0 +1,48 @@
+# Generated by Django 5.1.3 on 2026-10-19 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("categories", "0002_image_metadata"),
+        ("manufacturers", "0002_manufacturer_image_metadata"),
+        ("products", "0005_productimage_metadata"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="products_pr_manufac_198d93_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="products_pr_manufac_58b8d8_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="products_pr_manufac_4b914b_idx",
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["manufacturer", "price", "id"],
+                name="products_pr_manufac_3c3e2b_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["manufacturer", "created_at", "id"],
+                name="products_pr_manufac_b215dd_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["manufacturer", "rating", "id"],
+                name="products_pr_manufac_710c5b_idx",
+            ),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 
 from apps.categories.models import ProductCategory, RoomCategory
 from apps.manufacturers.models import Manufacturer
+from apps.media.models import ImageMetadataModel
 
 
 class Product(models.Model):
@@ -24,6 +25,9 @@ class Product(models.Model):
     room_category = models.ForeignKey(RoomCategory, on_delete=models.CASCADE, related_name="products")
     product_category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, related_name="products")
     manufacturer = models.ForeignKey(Manufacturer, on_delete=models.CASCADE, related_name="products")
+    stock = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Units available. Leave empty to not track stock."
+    )
     is_ar = models.BooleanField(default=False)
     ar_model = models.URLField(max_length=200, blank=True, null=True)
     ar_url = models.URLField(max_length=200, blank=True, null=True)
@@ -34,18 +38,81 @@ class Product(models.Model):
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
+        indexes = [
+            # Price range of one category or manufacturer, see apps/products/rollups.py
+            models.Index(fields=["room_category", "price"]),
+            models.Index(fields=["product_category", "price"]),
+            # Cover the sorts of the manufacturer products listing, with the id as the cursor tiebreaker
+            models.Index(fields=["manufacturer", "price", "id"]),
+            models.Index(fields=["manufacturer", "created_at", "id"]),
+            models.Index(fields=["manufacturer", "rating", "id"]),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Stock is only changed by F() updates (apps/products/utils.py). Writing back the value this instance
+        # was loaded with would undo every reservation made since, so ordinary saves leave the column alone.
+        if not self._state.adding and not kwargs.get("force_insert") and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name != "stock"
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets signal handlers tell which fields a save actually changed
+        instance._loaded_values = dict(zip(field_names, values, strict=True))
+        return instance
+
 
-class ProductImage(models.Model):
+class ProductImage(ImageMetadataModel):
     product = models.ForeignKey(Product, related_name="images", on_delete=models.CASCADE)
     image = models.ImageField(upload_to="images/products")
 
     class Meta:
         verbose_name = "Product Image"
         verbose_name_plural = "Product Images"
+        indexes = [
+            # Images still waiting for their metadata, found by backfill_image_metadata without a full scan
+            models.Index(
+                fields=["id"],
+                condition=~models.Q(image_metadata_for=models.F("image")),
+                name="product_image_metadata_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.title} image with ID: {self.pk}"
+
+
+class ProductRollup(models.Model):
+    """
+    Product count and price range of a room category, product category or manufacturer. Kept up to date by
+    the Product signals in apps/products/signals.py; the rebuild_product_rollups command corrects drift.
+    """
+
+    ROOM_CATEGORY = "room_category"
+    PRODUCT_CATEGORY = "product_category"
+    MANUFACTURER = "manufacturer"
+    DIMENSION_CHOICES = [
+        (ROOM_CATEGORY, "Room category"),
+        (PRODUCT_CATEGORY, "Product category"),
+        (MANUFACTURER, "Manufacturer"),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key_id = models.BigIntegerField()  # pk of the category or manufacturer
+    product_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Product Rollup"
+        verbose_name_plural = "Product Rollups"
+        constraints = [models.UniqueConstraint(fields=["dimension", "key_id"], name="products_rollup_unique")]
+
+    def __str__(self):
+        return f"{self.dimension} {self.key_id}: {self.product_count} products"
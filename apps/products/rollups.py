@@ -0,0 +1,177 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+
+from apps.categories.models import ProductCategory, RoomCategory
+from apps.manufacturers.models import Manufacturer
+
+from .models import Product, ProductRollup
+
+ROLLUP_MODELS = {
+    ProductRollup.ROOM_CATEGORY: RoomCategory,
+    ProductRollup.PRODUCT_CATEGORY: ProductCategory,
+    ProductRollup.MANUFACTURER: Manufacturer,
+}
+
+PRODUCT_STATS_PARAMETER = OpenApiParameter(
+    name="stats",
+    description="Include product_count, min_price and max_price of the products in each item.",
+    type=OpenApiTypes.BOOL,
+    required=False,
+)
+
+_price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+def _rollup_key(product, dimension):
+    return getattr(product, f"{dimension}_id")
+
+
+def add_to_rollup(dimension, key_id, price):
+    price = Value(Decimal(str(price)))
+    rollups = ProductRollup.objects.filter(dimension=dimension, key_id=key_id)
+    values = {
+        "product_count": F("product_count") + 1,
+        "min_price": Least(Coalesce("min_price", price), price),
+        "max_price": Greatest(Coalesce("max_price", price), price),
+    }
+    if not rollups.update(**values):
+        # First product of a new category or manufacturer
+        ProductRollup.objects.get_or_create(dimension=dimension, key_id=key_id)
+        rollups.update(**values)
+
+
+def remove_from_rollup(dimension, key_id, price):
+    rollups = ProductRollup.objects.filter(dimension=dimension, key_id=key_id)
+    rollups.update(product_count=Greatest(F("product_count") - 1, 0))
+    price_range = rollups.values("min_price", "max_price").first()
+    if price_range and Decimal(str(price)) in (price_range["min_price"], price_range["max_price"]):
+        # The removed product may have bounded the range; recompute it from the (dimension, price) index
+        rollups.update(
+            **Product.objects.filter(**{f"{dimension}_id": key_id}).aggregate(
+                min_price=Min("price"), max_price=Max("price")
+            )
+        )
+
+
+def product_saved(product, created):
+    """
+    Apply a saved product to the rollups of its categories and manufacturer. Only the dimensions whose key
+    or price changed are touched, so saving a product without changing them costs no queries.
+    """
+    # Values last applied to the rollups, falling back to the values the product was loaded with
+    previous = {} if created else getattr(product, "_rollup_values", getattr(product, "_loaded_values", {}))
+    for dimension in ROLLUP_MODELS:
+        key_id = _rollup_key(product, dimension)
+        old_key_id, old_price = previous.get(f"{dimension}_id", key_id), previous.get("price", product.price)
+        if created:
+            add_to_rollup(dimension, key_id, product.price)
+        elif (old_key_id, Decimal(str(old_price))) != (key_id, Decimal(str(product.price))):
+            remove_from_rollup(dimension, old_key_id, old_price)
+            add_to_rollup(dimension, key_id, product.price)
+    product._rollup_values = {
+        "price": product.price,
+        **{f"{dimension}_id": _rollup_key(product, dimension) for dimension in ROLLUP_MODELS},
+    }
+
+
+def product_deleted(product):
+    for dimension in ROLLUP_MODELS:
+        remove_from_rollup(dimension, _rollup_key(product, dimension), product.price)
+
+
+def refresh_rollups(dimension, key_ids):
+    """
+    Recompute the rollups of the given categories or manufacturers, for writes that bypass the signals.
+    """
+    stats = {
+        row["key_id"]: row
+        for row in Product.objects.filter(**{f"{dimension}_id__in": key_ids})
+        .values(key_id=F(f"{dimension}_id"))
+        .annotate(product_count=Count("id"), min_price=Min("price"), max_price=Max("price"))
+    }
+    for key_id in key_ids:
+        row = stats.get(key_id, {"product_count": 0, "min_price": None, "max_price": None})
+        ProductRollup.objects.update_or_create(
+            dimension=dimension,
+            key_id=key_id,
+            defaults={name: row[name] for name in ("product_count", "min_price", "max_price")},
+        )
+
+
+def rebuild_rollups():
+    """
+    Recompute every rollup from the Product table and write the rows that differ. Returns the number of
+    rows created, updated and deleted.
+    """
+    changes = {"created": 0, "updated": 0, "deleted": 0}
+    with transaction.atomic():
+        for dimension, model in ROLLUP_MODELS.items():
+            stats = {
+                row["key_id"]: row
+                for row in Product.objects.values(key_id=F(f"{dimension}_id")).annotate(
+                    product_count=Count("id"), min_price=Min("price"), max_price=Max("price")
+                )
+            }
+            existing = {rollup.key_id: rollup for rollup in ProductRollup.objects.filter(dimension=dimension)}
+            to_create, to_update = [], []
+            for key_id in model.objects.values_list("pk", flat=True):
+                row = stats.get(key_id, {"product_count": 0, "min_price": None, "max_price": None})
+                values = {name: row[name] for name in ("product_count", "min_price", "max_price")}
+                rollup = existing.pop(key_id, None)
+                if rollup is None:
+                    to_create.append(ProductRollup(dimension=dimension, key_id=key_id, **values))
+                elif any(getattr(rollup, name) != value for name, value in values.items()):
+                    for name, value in values.items():
+                        setattr(rollup, name, value)
+                    to_update.append(rollup)
+            ProductRollup.objects.bulk_create(to_create)
+            ProductRollup.objects.bulk_update(to_update, ["product_count", "min_price", "max_price"])
+            ProductRollup.objects.filter(pk__in=[rollup.pk for rollup in existing.values()]).delete()
+            changes["created"] += len(to_create)
+            changes["updated"] += len(to_update)
+            changes["deleted"] += len(existing)
+    return changes
+
+
+def get_product_rollups(dimension, key_ids=None):
+    rollups = ProductRollup.objects.filter(dimension=dimension)
+    if key_ids is not None:
+        rollups = rollups.filter(key_id__in=key_ids)
+    return {rollup.key_id: rollup for rollup in rollups}
+
+
+def product_stats_context(request, dimension, key_ids=None):
+    """
+    Serializer context that makes ProductRollupMixin add the product stats, if the request asked for them.
+    """
+    if request.query_params.get("stats", "").lower() not in ("1", "true"):
+        return {}
+    return {"product_rollups": get_product_rollups(dimension, key_ids)}
+
+
+class ProductRollupMixin:
+    """
+    Adds product_count, min_price and max_price to the representation when the serializer context holds
+    "product_rollups", a mapping of pk to ProductRollup as returned by get_product_rollups().
+    """
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        rollups = self.context.get("product_rollups")
+        if rollups is not None:
+            rollup = rollups.get(instance.pk) or ProductRollup()
+            data["product_count"] = rollup.product_count
+            data["min_price"] = (
+                _price_field.to_representation(rollup.min_price) if rollup.min_price is not None else None
+            )
+            data["max_price"] = (
+                _price_field.to_representation(rollup.max_price) if rollup.max_price is not None else None
+            )
+        return data
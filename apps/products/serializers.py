@@ -3,9 +3,10 @@ from decimal import Decimal
 from django.core.validators import MaxValueValidator, MinValueValidator
 from rest_framework import serializers
 
-from apps.categories.models import ProductCategory, RoomCategory
-from apps.manufacturers.models import Manufacturer
-from apps.users.models import Favorite
+from apps.categories.cache import product_categories, room_categories
+from apps.manufacturers.cache import manufacturers
+from apps.users.favorites import get_liked_product_ids
+from config.cache import CachedSlugRelatedField
 
 from .models import Product, ProductImage
 
@@ -13,7 +14,7 @@ from .models import Product, ProductImage
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
-        fields = ["image"]
+        fields = ["image", "image_width", "image_height", "image_color", "image_placeholder"]
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -70,9 +71,9 @@ class ProductSerializer(serializers.ModelSerializer):
             MinValueValidator(Decimal("0.0")),
         ],
     )
-    room_category = serializers.SlugRelatedField(slug_field="slug", queryset=RoomCategory.objects.all())
-    product_category = serializers.SlugRelatedField(slug_field="slug", queryset=ProductCategory.objects.all())
-    manufacturer = serializers.SlugRelatedField(slug_field="slug", queryset=Manufacturer.objects.all())
+    room_category = CachedSlugRelatedField(room_categories)
+    product_category = CachedSlugRelatedField(product_categories)
+    manufacturer = CachedSlugRelatedField(manufacturers)
     images = ProductImageSerializer(many=True)
     is_ar = serializers.BooleanField()
     ar_model = serializers.URLField()
@@ -82,25 +83,13 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         exclude = ["id", "created_at", "updated_at"]
+        # Changed only through reservations and the admin, never by writing a whole product back
+        read_only_fields = ["stock"]
 
     def create(self, validated_data):
         images_data = validated_data.pop("images")
-        room_category_data = validated_data.pop("room_category")
-        product_category_data = validated_data.pop("product_category")
-        manufacturer_data = validated_data.pop("manufacturer")
-
-        room_category = RoomCategory.objects.get(**room_category_data)
-
-        product_category = ProductCategory.objects.get(**product_category_data)
-
-        manufacturer = Manufacturer.objects.get(**manufacturer_data)
-
-        product = Product.objects.create(
-            room_category=room_category,
-            product_category=product_category,
-            manufacturer=manufacturer,
-            **validated_data,
-        )
+        # The category and manufacturer fields already resolved to instances
+        product = Product.objects.create(**validated_data)
 
         # Create ProductImage instances
         for image_data in images_data:
@@ -110,25 +99,8 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         images_data = validated_data.pop("images", None)  # Get images data
-        room_category_data = validated_data.pop("room_category", None)
-        product_category_data = validated_data.pop("product_category", None)
-        manufacturer_data = validated_data.pop("manufacturer", None)
-
-        if room_category_data:
-            room_category, created = RoomCategory.objects.get(id=instance.room_category.id, defaults=room_category_data)
-            instance.room_category = room_category
-
-        if product_category_data:
-            product_category, created = ProductCategory.objects.get(
-                id=instance.product_category.id, defaults=product_category_data
-            )
-            instance.product_category = product_category
-
-        if manufacturer_data:
-            manufacturer, created = Manufacturer.objects.get(id=instance.manufacturer.id, defaults=manufacturer_data)
-            instance.manufacturer = manufacturer
 
-        # Update other fields
+        # Update other fields, including the category and manufacturer instances
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
@@ -145,7 +117,10 @@ class ProductSerializer(serializers.ModelSerializer):
         return instance
 
     def get_is_favorite(self, obj) -> bool:
-        user = self.context["request"].user
-        if user.is_authenticated:
-            return Favorite.objects.filter(user=user, product=obj, is_liked=True).exists()
-        return False
+        request = self.context.get("request")
+        if request is None or not request.user.is_authenticated:
+            return False
+        # Read once per response: a list of products shares its context with every item
+        if "liked_product_ids" not in self.context:
+            self.context["liked_product_ids"] = get_liked_product_ids(request.user.pk)
+        return obj.pk in self.context["liked_product_ids"]
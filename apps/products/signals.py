@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from apps.categories.models import ProductCategory, RoomCategory
+from apps.manufacturers.models import Manufacturer
+
+from .models import Product, ProductRollup
+from .rollups import ROLLUP_MODELS, product_deleted, product_saved, refresh_rollups
+
+# Sent by utils.bulk_update_products() in place of post_save, which queryset.update() does not send.
+# Arguments: product_ids, fields (the updated field names) and previous_keys (dimension -> set of the
+# category or manufacturer ids the products had before the update).
+products_bulk_updated = Signal()
+
+
+@receiver(post_save, sender=Product)
+def product_rollups_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        product_saved(instance, created)
+
+
+@receiver(post_delete, sender=Product)
+def product_rollups_deleted(sender, instance, **kwargs):
+    product_deleted(instance)
+
+
+@receiver(post_delete, sender=RoomCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_delete, sender=Manufacturer)
+def rollup_owner_deleted(sender, instance, **kwargs):
+    dimension = next(dimension for dimension, model in ROLLUP_MODELS.items() if model is sender)
+    ProductRollup.objects.filter(dimension=dimension, key_id=instance.pk).delete()
+
+
+@receiver(products_bulk_updated)
+def product_rollups_bulk_updated(sender, product_ids, fields, previous_keys, **kwargs):
+    for dimension in ROLLUP_MODELS:
+        if dimension in fields or "price" in fields:
+            current_keys = Product.objects.filter(pk__in=product_ids).values_list(f"{dimension}_id", flat=True)
+            refresh_rollups(dimension, previous_keys[dimension] | set(current_keys))
@@ -0,0 +1,68 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.categories.models import ProductCategory, RoomCategory
+from apps.manufacturers.models import Manufacturer
+from config.testing import AdminQueryCountTestCase
+
+from .models import Product
+from .utils import reserve_stock
+
+
+def create_products(start, count):
+    # Every product gets its own categories and manufacturer, so that a missing join shows up as N+1
+    products = []
+    for i in range(start, start + count):
+        products.append(
+            Product.objects.create(
+                title=f"Product {i}",
+                description="Description",
+                color="Grey",
+                material="Wood",
+                price=10 + i,
+                room_category=RoomCategory.objects.create(name=f"Room {i}", slug=f"room-{i}"),
+                product_category=ProductCategory.objects.create(name=f"Category {i}", slug=f"category-{i}"),
+                manufacturer=Manufacturer.objects.create(name=f"Manufacturer {i}", slug=f"manufacturer-{i}"),
+                slug=f"product-{i}",
+            )
+        )
+    return products
+
+
+class ProductStockTests(TestCase):
+    def test_save_keeps_concurrent_reservations(self):
+        product = create_products(0, 1)[0]
+        Product.objects.filter(pk=product.pk).update(stock=5)
+        product = Product.objects.get(pk=product.pk)
+        # Another request reserves after this instance was loaded
+        self.assertTrue(reserve_stock(product.pk, 2))
+        product.title = "Renamed"
+        product.save()
+        product.refresh_from_db()
+        self.assertEqual((product.title, product.stock), ("Renamed", 3))
+
+
+class ProductAdminTests(AdminQueryCountTestCase):
+    def test_changelist_queries_do_not_grow_with_products(self):
+        self.assertChangelistQueriesConstant(reverse("admin:products_product_changelist"), create_products)
+
+    def test_search_queries_do_not_grow_with_products(self):
+        self.assertChangelistQueriesConstant(
+            reverse("admin:products_product_changelist") + "?q=Manufacturer", create_products
+        )
+
+    def test_change_stock_action_adds_to_current_stock(self):
+        tracked, untracked = create_products(0, 2)
+        Product.objects.filter(pk=tracked.pk).update(stock=5)
+        response = self.client.post(
+            reverse("admin:products_product_changelist"),
+            {"action": "change_stock", "_selected_action": [tracked.pk, untracked.pk], "value": "-2"},
+        )
+        self.assertEqual(response.status_code, 302)
+        stock = dict(Product.objects.values_list("pk", "stock"))
+        self.assertEqual((stock[tracked.pk], stock[untracked.pk]), (3, 0))
+
+    def test_stock_is_read_only_when_editing(self):
+        product = create_products(0, 1)[0]
+        response = self.client.get(reverse("admin:products_product_change", args=[product.pk]))
+        self.assertNotIn("stock", response.context["adminform"].form.fields)
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Product
+from .rollups import ROLLUP_MODELS
+from .signals import products_bulk_updated
+
+
+def reserve_stock(product_id, quantity):
+    # A single conditional UPDATE: the row lock is held only for this statement's transaction,
+    # and concurrent reservations can never take stock below zero.
+    updated = Product.objects.filter(pk=product_id, stock__gte=quantity).update(stock=F("stock") - quantity)
+    return updated == 1
+
+
+def release_stock(product_id, quantity):
+    Product.objects.filter(pk=product_id, stock__isnull=False).update(stock=F("stock") + quantity)
+
+
+def bulk_update_products(queryset, **values):
+    """
+    Apply values to every product of the queryset in a single UPDATE, then send products_bulk_updated once
+    so that carts and rollups are refreshed for the whole batch. Returns the number of updated products.
+    """
+    with transaction.atomic():
+        rows = list(queryset.values_list("pk", *(f"{dimension}_id" for dimension in ROLLUP_MODELS)))
+        product_ids = [row[0] for row in rows]
+        previous_keys = {dimension: {row[i] for row in rows} for i, dimension in enumerate(ROLLUP_MODELS, 1)}
+        updated = Product.objects.filter(pk__in=product_ids).update(**values, updated_at=timezone.now())
+        products_bulk_updated.send(
+            sender=Product, product_ids=product_ids, fields=set(values), previous_keys=previous_keys
+        )
+    return updated
@@ -40,7 +40,15 @@ class ProductView(APIView):
                             "room_category": "living-room",
                             "product_category": "sofa",
                             "manufacturer": "ikea",
-                            "images": [{"image": "http://example.com/sofa-1.jpg"}],
+                            "images": [
+                                {
+                                    "image": "http://example.com/sofa-1.jpg",
+                                    "image_width": 1200,
+                                    "image_height": 800,
+                                    "image_color": "#8a8d91",
+                                    "image_placeholder": "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD...",
+                                }
+                            ],
                             "is_ar": True,
                             "ar_model": "http://example.com/ar-model",
                             "ar_url": "http://example.com/ar-url",
@@ -89,7 +97,7 @@ class ProductView(APIView):
         ],
     )
     def post(self, request):
-        serializer = ProductSerializer(data=request.data)
+        serializer = ProductSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -111,7 +119,7 @@ class ProductDetailView(APIView):
     def get(self, request, product_slug):
         try:
             product = self.get_object(product_slug)
-            serializer = ProductSerializer(product)
+            serializer = ProductSerializer(product, context={"request": request})
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Product.DoesNotExist:
             return Response(
@@ -139,7 +147,7 @@ class ProductDetailView(APIView):
     def put(self, request, product_slug):
         try:
             product = self.get_object(product_slug)
-            serializer = ProductSerializer(product, data=request.data, partial=True)
+            serializer = ProductSerializer(product, data=request.data, partial=True, context={"request": request})
             if serializer.is_valid():
                 serializer.save()
                 return Response(serializer.data, status=status.HTTP_200_OK)
@@ -266,6 +274,8 @@ class ProductFilterView(APIView):
 
 
 class ProductSearchView(APIView):
+    throttle_scope = "search"
+
     @extend_schema(
         tags=["Products"],
         description="Search for products using full-text search. Searches across title, description, manufacturer, material, categories, and color fields.",
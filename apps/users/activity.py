@@ -0,0 +1,72 @@
+import logging
+import time
+from datetime import datetime, timezone
+
+import redis
+
+from config.cache import get_redis_client
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# User id -> epoch seconds, flushed to the User field of the same name by the flush_user_activity command
+ACTIVITY_KEYS = {"last_login": "activity:last_login", "last_seen": "activity:last_seen"}
+
+# last_seen is only recorded once per user per this many seconds and process
+LAST_SEEN_RESOLUTION = 60
+LAST_SEEN_MAX_TRACKED = 10000
+
+_last_seen_recorded = {}
+
+
+def _record(field, user_id, now):
+    try:
+        get_redis_client().hset(ACTIVITY_KEYS[field], user_id, now)
+    except redis.RedisError:
+        # Activity timestamps are informational and never worth failing a request over
+        logger.warning("Failed to record %s for user %s", field, user_id, exc_info=True)
+
+
+def record_login(user_id):
+    _record("last_login", user_id, time.time())
+
+
+def record_seen(user_id):
+    now = time.time()
+    if now - _last_seen_recorded.get(user_id, 0) < LAST_SEEN_RESOLUTION:
+        return
+    if len(_last_seen_recorded) >= LAST_SEEN_MAX_TRACKED:
+        _last_seen_recorded.clear()
+    _last_seen_recorded[user_id] = now
+    _record("last_seen", user_id, now)
+
+
+def flush_activity(batch_size=1000):
+    """
+    Move the recorded timestamps into the User table with one bulk UPDATE per batch. Each hash is renamed
+    before it is read, so timestamps recorded during the flush go to a fresh hash and are not lost.
+    Returns the number of users updated per field.
+    """
+    client = get_redis_client()
+    flushed = {}
+    for field, key in ACTIVITY_KEYS.items():
+        flushing_key = f"{key}:flushing"
+        # A leftover hash means a previous flush failed after the rename; write it before it gets overwritten
+        if not client.exists(flushing_key):
+            try:
+                client.rename(key, flushing_key)
+            except redis.ResponseError:
+                flushed[field] = 0  # Nothing recorded since the last flush
+                continue
+
+        timestamps = {
+            int(user_id): datetime.fromtimestamp(float(value), tz=timezone.utc)
+            for user_id, value in client.hgetall(flushing_key).items()
+        }
+        users = [User(pk=user_id, **{field: value}) for user_id, value in timestamps.items()]
+        # Users deleted since their activity was recorded simply match no row
+        User.objects.bulk_update(users, [field], batch_size=batch_size)
+        client.delete(flushing_key)
+        flushed[field] = len(users)
+    return flushed
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Favorite, User, UserOTP
+from .models import Favorite, OutgoingEmail, User, UserOTP
 
 
 class UserOTPInline(admin.TabularInline):
@@ -11,6 +11,10 @@ class UserOTPInline(admin.TabularInline):
 class FavoriteInline(admin.TabularInline):
     model = Favorite
     extra = 0
+    autocomplete_fields = ("product",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product")
 
 
 @admin.register(User)
@@ -26,6 +30,7 @@ class UserAdmin(admin.ModelAdmin):
         "image",
         "date_joined",
         "last_login",
+        "last_seen",
     )
     search_fields = ("email", "first_name", "last_name")
     list_filter = ("is_active", "is_staff", "date_joined", "last_login")
@@ -35,7 +40,8 @@ class UserAdmin(admin.ModelAdmin):
         "first_name",
         "last_name",
     )
-    readonly_fields = ("id", "date_joined", "last_login")
+    readonly_fields = ("id", "date_joined", "last_login", "last_seen")
+    show_full_result_count = False
     inlines = [UserOTPInline, FavoriteInline]
 
 
@@ -51,16 +57,31 @@ class UserOTPAdmin(admin.ModelAdmin):
         "updated_at",
         "expires_at",
     )
-    search_fields = ("user",)
+    list_select_related = ("user",)
+    search_fields = ("user__email",)
     list_filter = ("otp_attempts", "is_blocked", "expires_at")
     ordering = ("user", "otp_attempts")
+    raw_id_fields = ("user",)
     readonly_fields = ("id", "created_at", "expires_at", "updated_at")
 
 
 @admin.register(Favorite)
 class FavoritesAdmin(admin.ModelAdmin):
     list_display = ("user", "product", "is_liked", "id", "created_at", "updated_at")
-    search_fields = ("user", "product", "is_liked")
-    list_filter = ("user", "is_liked")
-    ordering = ("id", "user", "product", "is_liked")
+    list_select_related = ("user", "product")
+    search_fields = ("user__email", "product__title", "product__slug")
+    # Filtering by user would render every user into the sidebar; search by email instead
+    list_filter = ("is_liked", "updated_at")
+    ordering = ("id",)
+    raw_id_fields = ("user", "product")
+    show_full_result_count = False
     readonly_fields = ("id", "created_at", "updated_at")
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "recipients", "status", "attempts", "next_attempt_at", "sent_at", "created_at")
+    search_fields = ("subject", "recipients")
+    list_filter = ("status", "created_at")
+    ordering = ("-created_at",)
+    readonly_fields = ("id", "created_at", "sent_at", "last_error")
@@ -0,0 +1,45 @@
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .activity import record_seen
+from .models import User
+from .tokens import TOKEN_USER_CLAIMS
+from .utils import is_token_revoked
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Builds request.user from the signed claims of the access token instead of loading it on every request.
+    Only the claimed fields are loaded; views that need the rest of the model use get_full_user().
+    Tokens issued before the claims existed are resolved from the database as before.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            record_seen(result[0].pk)
+        return result
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from None
+
+        if is_token_revoked(user_id, validated_token.get("iat", 0)):
+            raise AuthenticationFailed(_("Token is revoked"), code="token_revoked")
+
+        if not all(claim in validated_token for claim in TOKEN_USER_CLAIMS):
+            return super().get_user(validated_token)
+        if not validated_token["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        claims = {claim: validated_token[claim] for claim in TOKEN_USER_CLAIMS}
+        claims[api_settings.USER_ID_FIELD] = user_id
+        # from_db expects the loaded values in field order; every other field is deferred
+        fields = [field.attname for field in User._meta.concrete_fields if field.attname in claims]
+        return User.from_db(router.db_for_read(User), fields, [claims[field] for field in fields])
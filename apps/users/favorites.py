@@ -0,0 +1,141 @@
+import functools
+import logging
+import uuid
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+import redis
+
+from apps.products.models import Product
+from config.cache import get_redis_client
+
+from .models import Favorite
+
+logger = logging.getLogger(__name__)
+
+LIKED_IDS_TIMEOUT = 60 * 60  # 1 hour
+REBUILD_TOKEN_TIMEOUT = 60  # seconds a read may take between taking its token and storing the set
+# Product ids start at 1, so 0 can mark a loaded set and tell "likes nothing" apart from "not cached"
+LOADED_MARKER = 0
+
+# Applies a write to the cached set only if it is loaded; a missing set is rebuilt from the database on
+# the next read anyway. Deleting the rebuild token stops a read that may have queried the database before
+# this write committed from storing what it read. KEYS: set, rebuild token. ARGV: SADD or SREM, product ids.
+UPDATE_LIKED_IDS_SCRIPT = """
+redis.call("DEL", KEYS[2])
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    redis.call(ARGV[1], KEYS[1], unpack(ARGV, 2))
+end
+"""
+
+# Stores a set read from the database, unless a write bumped the rebuild token since the read took it.
+# KEYS: set, rebuild token. ARGV: token, timeout, LOADED_MARKER and the product ids.
+STORE_LIKED_IDS_SCRIPT = """
+if redis.call("GET", KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+redis.call("DEL", KEYS[1], KEYS[2])
+redis.call("SADD", KEYS[1], unpack(ARGV, 3))
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 1
+"""
+
+
+def liked_ids_key(user_id):
+    return f"favorites:{user_id}:ids"
+
+
+def liked_ids_token_key(user_id):
+    return f"favorites:{user_id}:ids:token"
+
+
+@functools.cache
+def get_update_liked_ids_script():
+    return get_redis_client().register_script(UPDATE_LIKED_IDS_SCRIPT)
+
+
+@functools.cache
+def get_store_liked_ids_script():
+    return get_redis_client().register_script(STORE_LIKED_IDS_SCRIPT)
+
+
+def get_liked_product_ids(user_id):
+    """
+    Ids of the products the user likes, from a per-user Redis set that is loaded from Favorite on first use
+    and kept up to date by like_products() and unlike_products().
+    """
+    keys = [liked_ids_key(user_id), liked_ids_token_key(user_id)]
+    try:
+        ids = {int(member) for member in get_redis_client().smembers(keys[0])}
+        if LOADED_MARKER in ids:
+            return ids - {LOADED_MARKER}
+
+        # Taken before reading the database: a write that commits after the read deletes it, and the set is not stored
+        token = uuid.uuid4().hex
+        get_redis_client().set(keys[1], token, ex=REBUILD_TOKEN_TIMEOUT)
+        ids = set(Favorite.objects.filter(user_id=user_id, is_liked=True).values_list("product_id", flat=True))
+        get_store_liked_ids_script()(keys=keys, args=[token, LIKED_IDS_TIMEOUT, LOADED_MARKER, *ids])
+        return ids
+    except redis.RedisError:
+        logger.warning("Failed to read liked products of user %s from the cache", user_id, exc_info=True)
+        return set(Favorite.objects.filter(user_id=user_id, is_liked=True).values_list("product_id", flat=True))
+
+
+def update_liked_product_ids(user_id, command, product_ids):
+    if not product_ids:
+        return
+
+    def update():
+        try:
+            get_update_liked_ids_script()(
+                keys=[liked_ids_key(user_id), liked_ids_token_key(user_id)], args=[command, *product_ids]
+            )
+        except redis.RedisError:
+            logger.warning("Failed to update liked products of user %s in the cache", user_id, exc_info=True)
+
+    transaction.on_commit(update)
+
+
+def like_products(user_id, product_slugs):
+    """
+    Like the products with the given slugs in a single INSERT ... ON CONFLICT statement joined on the slug.
+    Returns the ids of the products that were not liked before; unknown slugs and products that are
+    already liked are left out.
+    """
+    if not product_slugs:
+        return []
+    now = timezone.now()
+    placeholders = ", ".join(["%s"] * len(product_slugs))
+    sql = f"""
+        INSERT INTO {Favorite._meta.db_table} (user_id, product_id, is_liked, created_at, updated_at)
+        SELECT %s, id, %s, %s, %s FROM {Product._meta.db_table} WHERE slug IN ({placeholders})
+        ON CONFLICT (user_id, product_id) DO UPDATE SET is_liked = excluded.is_liked, updated_at = excluded.updated_at
+        WHERE {Favorite._meta.db_table}.is_liked = %s
+        RETURNING product_id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, True, now, now, *product_slugs, False])
+        product_ids = [row[0] for row in cursor.fetchall()]
+    update_liked_product_ids(user_id, "SADD", product_ids)
+    return product_ids
+
+
+def unlike_products(user_id, product_slugs=None):
+    """
+    Unlike the products with the given slugs, or every liked product when no slugs are given, in a single
+    UPDATE. Returns the ids of the products that were liked before.
+    """
+    if product_slugs is not None and not product_slugs:
+        return []
+    sql = f"UPDATE {Favorite._meta.db_table} SET is_liked = %s, updated_at = %s WHERE user_id = %s AND is_liked = %s"
+    params = [False, timezone.now(), user_id, True]
+    if product_slugs is not None:
+        placeholders = ", ".join(["%s"] * len(product_slugs))
+        sql += f" AND product_id IN (SELECT id FROM {Product._meta.db_table} WHERE slug IN ({placeholders}))"
+        params += product_slugs
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING product_id", params)
+        product_ids = [row[0] for row in cursor.fetchall()]
+    update_liked_product_ids(user_id, "SREM", product_ids)
+    return product_ids
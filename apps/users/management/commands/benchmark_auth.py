@@ -0,0 +1,133 @@
+import statistics
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.users.models import User
+from apps.users.tokens import UserRefreshToken
+from apps.users.views import CustomTokenRefreshView, LoginView, PasswordChangeView, RegisterView
+
+PASSWORDS = ("Benchmark-password-1", "Benchmark-password-2")
+ENDPOINTS = ("hash", "login", "register", "refresh", "password_change")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure p50/p99 latency and single-worker throughput of the authentication endpoints on this machine. "
+        "Everything runs in a transaction that is rolled back, so no users are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="Timed requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per endpoint.")
+        parser.add_argument(
+            "--endpoints", default=",".join(ENDPOINTS), help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}."
+        )
+        parser.add_argument(
+            "--hasher",
+            choices=sorted(settings.PASSWORD_HASHER_CHOICES),
+            help="Hash passwords with this hasher instead of PASSWORD_HASHER.",
+        )
+        parser.add_argument("--argon2-time-cost", type=int, help="Override ARGON2_TIME_COST.")
+        parser.add_argument("--argon2-memory-cost", type=int, help="Override ARGON2_MEMORY_COST (KiB).")
+        parser.add_argument("--argon2-parallelism", type=int, help="Override ARGON2_PARALLELISM.")
+
+    def handle(self, *args, **options):
+        endpoints = options["endpoints"].split(",")
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        if options["iterations"] < 2:
+            raise CommandError("--iterations must be at least 2.")
+
+        overrides = {}
+        if options["hasher"]:
+            preferred = settings.PASSWORD_HASHER_CHOICES[options["hasher"]]
+            overrides["PASSWORD_HASHERS"] = sorted(settings.PASSWORD_HASHERS, key=lambda hasher: hasher != preferred)
+        for name in ("time_cost", "memory_cost", "parallelism"):
+            if options[f"argon2_{name}"] is not None:
+                overrides[f"ARGON2_{name.upper()}"] = options[f"argon2_{name}"]
+
+        self.factory = APIRequestFactory()
+        # Every email of this run is unique, so it cannot clash with real or concurrently benchmarked users
+        self.prefix = f"benchmark-{uuid4().hex[:8]}"
+        with override_settings(**overrides), transaction.atomic():
+            self.stdout.write(f"Hasher: {settings.PASSWORD_HASHERS[0]}")
+            self.stdout.write(f"{'endpoint':<16}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}")
+            self.user = User.objects.create_user(email=f"{self.prefix}@example.com", password=PASSWORDS[0])
+            for endpoint in endpoints:
+                self.report(endpoint, self.measure(getattr(self, f"prepare_{endpoint}"), options))
+            transaction.set_rollback(True)
+
+    def measure(self, prepare, options):
+        timings, errors = [], 0
+        for i in range(options["warmup"] + options["iterations"]):
+            # Building the request is not timed; running the view and rendering its response is
+            run = prepare(i)
+            started = time.perf_counter()
+            try:
+                ok = run()
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            if i >= options["warmup"]:
+                timings.append(elapsed)
+                errors += not ok
+        return timings, errors
+
+    def report(self, endpoint, result):
+        timings, errors = result
+        percentiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            f"{endpoint:<16}{percentiles[49] * 1000:>10.1f}{percentiles[98] * 1000:>10.1f}"
+            f"{len(timings) / sum(timings):>10.1f}{errors:>8}"
+        )
+
+    def call(self, view, request):
+        response = view(request)
+        response.render()
+        return response.status_code < 400
+
+    def prepare_hash(self, i):
+        # Hashing on its own: the floor under login, register and password change
+        encoded = make_password(PASSWORDS[0])
+        return lambda: check_password(PASSWORDS[0], encoded)
+
+    def prepare_login(self, i):
+        request = self.factory.post(
+            "/api/v1/user/login", {"email": self.user.email, "password": PASSWORDS[0]}, format="json"
+        )
+        return lambda: self.call(LoginView.as_view(throttle_classes=[]), request)
+
+    def prepare_register(self, i):
+        data = {
+            "email": f"{self.prefix}-{i}@example.com",
+            "password": PASSWORDS[0],
+            "password_confirm": PASSWORDS[0],
+            "first_name": "Bench",
+            "last_name": "Mark",
+        }
+        request = self.factory.post("/api/v1/user/register", data, format="json")
+        return lambda: self.call(RegisterView.as_view(throttle_classes=[]), request)
+
+    def prepare_refresh(self, i):
+        refresh = UserRefreshToken.for_user(self.user)
+        request = self.factory.post("/api/v1/user/token/refresh", {"refresh": str(refresh)}, format="json")
+        return lambda: self.call(CustomTokenRefreshView.as_view(throttle_classes=[]), request)
+
+    def prepare_password_change(self, i):
+        # Alternate between two passwords, as the new password may not equal the current one
+        current, new = PASSWORDS[i % 2], PASSWORDS[(i + 1) % 2]
+        data = {"current_password": current, "new_password": new, "new_password_confirm": new}
+        request = self.factory.post("/api/v1/user/password/change", data, format="json")
+        request.session = SessionStore()
+        force_authenticate(request, user=self.user)
+        return lambda: self.call(PasswordChangeView.as_view(throttle_classes=[]), request)
@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.users.models import Favorite
+from config.db import delete_in_batches
+
+
+class Command(BaseCommand):
+    help = "Delete favorites that have been unliked for longer than --days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Delete favorites unliked for this many days.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        # Re-liking a favorite sets is_liked, so rows liked again mid-run no longer match and are kept
+        favorites = Favorite.objects.filter(
+            is_liked=False, updated_at__lt=timezone.now() - timedelta(days=options["days"])
+        )
+        deleted = delete_in_batches(favorites, options["batch_size"], options["pause"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted[Favorite._meta.label]} unliked favorites in {time.monotonic() - started:.2f}s."
+            )
+        )
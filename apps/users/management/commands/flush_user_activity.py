@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.users.activity import flush_activity
+
+
+class Command(BaseCommand):
+    help = "Write the last login and last seen timestamps recorded in Redis to the User table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Users updated per query.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        flushed = flush_activity(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated last_login for {flushed['last_login']} and last_seen for {flushed['last_seen']} users "
+                f"in {time.monotonic() - started:.2f}s."
+            )
+        )
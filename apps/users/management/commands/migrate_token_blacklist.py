@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.users.utils import blacklist_token
+from config.db import delete_in_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy unexpired tokens from the token_blacklist tables into the cache-backed blacklist, "
+        "then delete expired rows (or all rows with --delete-all) in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete-all", action="store_true", help="Also delete unexpired rows once they have been copied."
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows copied or deleted per batch.")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between delete batches.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        now = timezone.now()
+
+        copied = 0
+        blacklisted = (
+            BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            .values_list("token__jti", "token__expires_at")
+            .order_by("pk")
+        )
+        for jti, expires_at in blacklisted.iterator(chunk_size=options["batch_size"]):
+            blacklist_token(jti, int(expires_at.timestamp()))
+            copied += 1
+
+        outstanding = OutstandingToken.objects.all()
+        if not options["delete_all"]:
+            outstanding = outstanding.filter(expires_at__lte=now)
+        deleted = delete_in_batches(outstanding, options["batch_size"], options["pause"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Copied {copied} blacklisted tokens to the cache and deleted "
+                f"{deleted[OutstandingToken._meta.label]} outstanding and {deleted[BlacklistedToken._meta.label]} "
+                f"blacklisted rows in {time.monotonic() - started:.2f}s."
+            )
+        )
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.users.models import OutgoingEmail
+from config.db import delete_in_batches
+
+
+class Command(BaseCommand):
+    help = "Delete sent and permanently failed emails from the OutgoingEmail outbox once older than --days."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.OUTGOING_EMAIL_RETENTION_DAYS,
+            help="Delete sent and failed emails queued more than this many days ago.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        # Pending messages are left to send_emails however old they are
+        emails = OutgoingEmail.objects.exclude(status=OutgoingEmail.PENDING).filter(
+            created_at__lt=timezone.now() - timedelta(days=options["days"])
+        )
+        deleted = delete_in_batches(emails, options["batch_size"], options["pause"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted[OutgoingEmail._meta.label]} emails in {time.monotonic() - started:.2f}s."
+            )
+        )
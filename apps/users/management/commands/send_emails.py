@@ -0,0 +1,124 @@
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.users.models import OutgoingEmail
+
+# A claimed message is not picked up again for this long, so a crashed worker only delays it
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the OutgoingEmail outbox, retrying failures with exponential backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=4, help="Threads sending in parallel, one SMTP connection each."
+        )
+        parser.add_argument("--batch-size", type=int, default=50, help="Messages claimed per query.")
+        parser.add_argument(
+            "--poll-interval", type=float, default=2.0, help="Seconds to sleep when the outbox is empty."
+        )
+        parser.add_argument("--max-attempts", type=int, default=5, help="Attempts before a message is marked failed.")
+        parser.add_argument(
+            "--backoff", type=float, default=30.0, help="Seconds before the first retry, doubled after each."
+        )
+        parser.add_argument("--once", action="store_true", help="Exit once the outbox has no due messages.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.local = threading.local()
+        self.connections = []
+        sent = failed = 0
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            try:
+                while True:
+                    emails = self.claim()
+                    if not emails:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll_interval"])
+                        continue
+
+                    for email, error in zip(emails, executor.map(self.send, emails), strict=True):
+                        if error is None:
+                            self.mark_sent(email)
+                            sent += 1
+                        else:
+                            self.mark_failed(email, error)
+                            failed += 1
+            finally:
+                for connection in self.connections:
+                    connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails, {failed} attempts failed."))
+
+    def claim(self):
+        now = timezone.now()
+        with transaction.atomic():
+            # Rows claimed by another worker process are skipped rather than waited on
+            pks = list(
+                OutgoingEmail.objects.select_for_update(skip_locked=True)
+                .filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+                .order_by("next_attempt_at")
+                .values_list("pk", flat=True)[: self.options["batch_size"]]
+            )
+            OutgoingEmail.objects.filter(pk__in=pks).update(next_attempt_at=now + CLAIM_TIMEOUT)
+        return list(OutgoingEmail.objects.filter(pk__in=pks))
+
+    def get_connection(self):
+        # One SMTP connection per worker thread, opened on first use and kept for the following messages
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = get_connection(fail_silently=False)
+            connection.open()
+            self.connections.append(connection)
+        return connection
+
+    def send(self, email):
+        message = EmailMessage(email.subject, email.message, settings.DEFAULT_FROM_EMAIL, email.recipients)
+        try:
+            connection = self.get_connection()
+            try:
+                connection.send_messages([message])
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped the idle connection; reconnect once before counting a failure
+                connection.close()
+                connection.open()
+                connection.send_messages([message])
+        except Exception as e:
+            # Start over with a fresh connection for this thread's next message
+            connection = getattr(self.local, "connection", None)
+            if connection is not None:
+                connection.close()
+                self.local.connection = None
+            return e
+        return None
+
+    def mark_sent(self, email):
+        # The message may hold one-time codes; once delivered there is no reason to keep them readable
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            status=OutgoingEmail.SENT, attempts=F("attempts") + 1, sent_at=timezone.now(), last_error="", message=""
+        )
+
+    def mark_failed(self, email, error):
+        attempts = email.attempts + 1
+        if attempts >= self.options["max_attempts"]:
+            status, next_attempt_at = OutgoingEmail.FAILED, email.next_attempt_at
+        else:
+            status = OutgoingEmail.PENDING
+            next_attempt_at = timezone.now() + timedelta(seconds=self.options["backoff"] * 2 ** (attempts - 1))
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            status=status, attempts=attempts, next_attempt_at=next_attempt_at, last_error=repr(error)
+        )
+        self.stderr.write(f"Failed to send email {email.pk} (attempt {attempts}): {error!r}")
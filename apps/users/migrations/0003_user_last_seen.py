@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_outgoingemail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="last_seen",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0002_product_stock"),
+        ("users", "0003_user_last_seen"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                fields=["user", "is_liked", "-updated_at"],
+                name="users_favorite_liked_idx",
+            ),
+        ),
+    ]
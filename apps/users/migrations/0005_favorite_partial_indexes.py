@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0002_product_stock"),
+        ("users", "0004_favorite_liked_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="favorite",
+            name="users_favorite_liked_idx",
+        ),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                condition=models.Q(("is_liked", True)),
+                fields=["user", "-updated_at"],
+                name="users_favorite_liked_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                condition=models.Q(("is_liked", False)),
+                fields=["updated_at"],
+                name="users_favorite_unliked_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-19 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_product_manufacturer_sort_tiebreakers"),
+        ("users", "0005_favorite_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="favorite",
+            name="users_favorite_liked_idx",
+        ),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                condition=models.Q(("is_liked", True)),
+                fields=["user", "-updated_at", "-id"],
+                name="users_favorite_liked_idx",
+            ),
+        ),
+    ]
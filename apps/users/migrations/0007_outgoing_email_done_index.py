@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-19 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_favorite_liked_index_tiebreaker"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="outgoingemail",
+            index=models.Index(
+                condition=models.Q(("status", "pending"), _negated=True),
+                fields=["created_at"],
+                name="users_outgoing_email_done_idx",
+            ),
+        ),
+    ]
@@ -17,6 +17,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(blank=True, null=True)  # Flushed periodically from apps.users.activity
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -30,8 +31,16 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so that a save which deactivates the user can be told apart
+        instance._loaded_values = dict(zip(field_names, values, strict=True))
+        return instance
+
 
 class UserOTP(models.Model):
+    # No longer written: OTP state lives in Redis (see apps.users.utils). Kept so existing rows stay browsable.
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="otp")
     otp = models.IntegerField()
     otp_attempts = models.IntegerField(default=3)
@@ -64,8 +73,60 @@ class Favorite(models.Model):
 
     class Meta:
         unique_together = ("user", "product")  # User can like a product only once
+        indexes = [
+            # Backs the "recently liked first" favorites listing; only liked rows are indexed
+            models.Index(
+                fields=["user", "-updated_at", "-id"],
+                name="users_favorite_liked_idx",
+                condition=models.Q(is_liked=True),
+            ),
+            # Lets compact_favorites find unliked rows without scanning the table
+            models.Index(
+                fields=["updated_at"],
+                name="users_favorite_unliked_idx",
+                condition=models.Q(is_liked=False),
+            ),
+        ]
         verbose_name = "Favorite"
         verbose_name_plural = "Favorites"
 
     def __str__(self):
         return f"{self.user.email} likes {self.product.title}"
+
+
+class OutgoingEmail(models.Model):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Outgoing Email"
+        verbose_name_plural = "Outgoing Emails"
+        indexes = [
+            # The send_emails worker only ever scans pending messages that are due
+            models.Index(
+                fields=["next_attempt_at"],
+                name="users_outgoing_email_due_idx",
+                condition=models.Q(status="pending"),
+            ),
+            # purge_emails deletes the messages that are done with, oldest first
+            models.Index(
+                fields=["created_at"],
+                name="users_outgoing_email_done_idx",
+                condition=~models.Q(status="pending"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
@@ -1,5 +1,21 @@
 from rest_framework.permissions import BasePermission
 
+from .utils import get_user_group_names
+
+
+def get_group_names(request):
+    """
+    Group names of the requesting user, resolved once per request: from the token's ``groups`` claim
+    when present, otherwise from the per-user cache.
+    """
+    if not hasattr(request, "_group_names"):
+        token = request.auth
+        if token is not None and "groups" in token:
+            request._group_names = set(token["groups"])
+        else:
+            request._group_names = set(get_user_group_names(request.user.pk))
+    return request._group_names
+
 
 class GroupPermission(BasePermission):
     """
@@ -10,9 +26,7 @@ class GroupPermission(BasePermission):
         self.group_name = group_name
 
     def has_permission(self, request, view):
-        return (
-            request.user and request.user.is_authenticated and request.user.groups.filter(name=self.group_name).exists()
-        )
+        return bool(request.user and request.user.is_authenticated and self.group_name in get_group_names(request))
 
 
 class HasAccessToSwagger(GroupPermission):
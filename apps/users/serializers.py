@@ -11,8 +11,8 @@ from apps.manufacturers.models import Manufacturer
 from apps.products.models import Product
 from apps.products.serializers import ProductImageSerializer
 
-from .models import Favorite, User, UserOTP
-from .utils import validate_otp, validate_password_data
+from .models import Favorite, User
+from .utils import is_otp_validated, validate_otp, validate_password_data
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -108,12 +108,8 @@ class PasswordResetSerializer(serializers.Serializer):
             raise serializers.ValidationError("User with this email does not exist.")
 
         # Check if OTP is validated before allowing password reset
-        try:
-            user_otp = UserOTP.objects.get(user=user)
-            if not user_otp.is_validated:
-                raise serializers.ValidationError("OTP has not been validated. Please validate it first.")
-        except UserOTP.DoesNotExist:
-            raise serializers.ValidationError("No OTP record found for this user.")
+        if not is_otp_validated(user):
+            raise serializers.ValidationError("OTP has not been validated. Please validate it first.")
 
         # Validate new password with the provided data
         try:
@@ -169,11 +165,8 @@ class OTPValidationSerializer(serializers.Serializer):
         return data
 
     def save(self, **kwargs):
-        user = self.validated_data["user"]
-        user_otp = UserOTP.objects.get(user=user)
-        user_otp.is_validated = True
-        user_otp.save()
-        return user
+        # validate_otp already marked the OTP as validated
+        return self.validated_data["user"]
 
 
 class RefreshTokenSerializer(serializers.Serializer):
@@ -224,6 +217,19 @@ class FavoriteSlugSerializer(serializers.ModelSerializer):
         fields = ["product_slug"]
 
 
+class FavoriteBatchSerializer(serializers.Serializer):
+    product_slugs = serializers.ListField(child=serializers.SlugField(), allow_empty=False, max_length=100)
+    is_liked = serializers.BooleanField(default=True)
+
+
+class FavoriteBatchResponseSerializer(serializers.Serializer):
+    updated = serializers.IntegerField()
+
+
+class FavoriteIdsSerializer(serializers.Serializer):
+    product_ids = serializers.ListField(child=serializers.IntegerField())
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
     title = serializers.CharField(source="product.title", max_length=255)
     description = serializers.CharField(source="product.description", max_length=1000)
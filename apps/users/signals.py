@@ -0,0 +1,49 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import User
+from .utils import invalidate_user_groups, revoke_user_tokens, user_cache_key
+
+
+def invalidate_user_groups_on_commit(user_ids):
+    # Read now: the members of a cleared or deleted group are gone by the time the transaction commits.
+    # Deleting only after the commit keeps a concurrent request from caching the old membership again.
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: invalidate_user_groups(user_ids))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_user_groups_on_commit([instance.pk])
+    elif action == "pre_clear":
+        invalidate_user_groups_on_commit(instance.user_set.values_list("pk", flat=True))
+    else:
+        invalidate_user_groups_on_commit(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate_user_groups_on_commit(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    """
+    Revoke the user's tokens when a save deactivates them. Creating an inactive user, as registration does
+    until the email is verified, or saving one that was already inactive revokes nothing. Bulk deactivation
+    with queryset.update(is_active=False) sends no signal: call revoke_user_tokens for those users.
+    """
+    loaded = getattr(instance, "_loaded_values", {})
+    if not created and (update_fields is None or "is_active" in update_fields):
+        # Instances that were not loaded from the database may be deactivating a user too
+        if loaded.get("is_active", True) and not instance.is_active:
+            revoke_user_tokens(instance.pk)
+        loaded["is_active"] = instance.is_active
+    transaction.on_commit(lambda: cache.delete(user_cache_key(instance.pk)))
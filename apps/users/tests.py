@@ -0,0 +1,419 @@
+import socketserver
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from apps.products.tests import create_products
+from config.cache import get_redis_client
+from config.testing import AdminQueryCountTestCase, RedisTestCase
+from config.throttling import SlidingWindowRateThrottle
+
+from . import favorites
+from .favorites import get_liked_product_ids, like_products, liked_ids_key, liked_ids_token_key
+from .models import Favorite, OutgoingEmail, User, UserOTP
+from .utils import (
+    OTP_BLOCK_TIMEOUT,
+    OTP_ERRORS,
+    OTP_MAX_ATTEMPTS,
+    OTP_VALIDATED_TIMEOUT,
+    blacklist_token,
+    get_user_group_names,
+    invalidate_user_groups,
+    is_otp_validated,
+    is_token_blacklisted,
+    otp_keys,
+    reset_otp_data,
+    send_email,
+    send_otp_email,
+    token_blacklist_key,
+    user_groups_key,
+    user_revoked_key,
+    validate_otp,
+)
+from .views import FavoriteCursorPagination
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost ESMTP")
+        while line := self.rfile.readline().decode().rstrip("\r\n"):
+            command = line[:4].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command == "RCPT" and self.server.reject_recipients:
+                self.reply("550 Mailbox unavailable")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (line := self.rfile.readline().decode()) != ".\r\n":
+                    data.append(line)
+                self.server.messages.append("".join(data))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                break
+            else:
+                self.reply("250 OK")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.reject_recipients = False
+
+
+class SendEmailsCommandTests(TestCase):
+    def setUp(self):
+        self.server = FakeSMTPServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        settings_override = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.server.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            DEFAULT_FROM_EMAIL="noreply@example.com",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def send_emails(self, *args):
+        call_command("send_emails", "--once", *args, stdout=StringIO(), stderr=StringIO())
+
+    def test_send_email_only_enqueues(self):
+        send_email("Subject", "Body", ["user@example.com"])
+
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.recipients, ["user@example.com"])
+        self.assertEqual(self.server.connections, 0)
+
+    def test_worker_reuses_one_connection(self):
+        for i in range(3):
+            send_email(f"Subject {i}", "Body", [f"user{i}@example.com"])
+
+        self.send_emails("--workers", "1")
+
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.SENT, attempts=1).count(), 3)
+
+    def test_sent_message_is_cleared(self):
+        send_email("OTP Verification", "Your OTP is 123456.", ["user@example.com"])
+        self.send_emails()
+
+        self.assertIn("Your OTP is 123456.", self.server.messages[0])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.status, email.message), (OutgoingEmail.SENT, ""))
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.server.reject_recipients = True
+        send_email("Subject", "Body", ["user@example.com"])
+
+        self.send_emails("--max-attempts", "2")
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("550", email.last_error)
+
+        # Not due yet, so a second run leaves it alone
+        self.send_emails("--max-attempts", "2")
+        self.assertEqual(OutgoingEmail.objects.get().attempts, 1)
+
+        OutgoingEmail.objects.update(next_attempt_at=email.created_at)
+        self.send_emails("--max-attempts", "2")
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.FAILED)
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(self.server.messages, [])
+
+
+class PurgeEmailsCommandTests(TestCase):
+    def test_only_old_sent_and_failed_emails_are_deleted(self):
+        for status in (OutgoingEmail.PENDING, OutgoingEmail.SENT, OutgoingEmail.FAILED):
+            for age in (1, 10):
+                email = OutgoingEmail.objects.create(
+                    subject=f"{status} {age}", message="Body", recipients=[], status=status
+                )
+                OutgoingEmail.objects.filter(pk=email.pk).update(created_at=timezone.now() - timedelta(days=age))
+
+        call_command("purge_emails", "--pause", "0", stdout=StringIO())
+
+        self.assertEqual(
+            set(OutgoingEmail.objects.values_list("subject", flat=True)),
+            {"pending 1", "pending 10", "sent 1", "failed 1"},
+        )
+
+
+def create_users(start, count):
+    for i, product in enumerate(create_products(start, count), start):
+        user = User.objects.create_user(email=f"user{i}@example.com", password="password")
+        UserOTP.objects.create(user=user, otp=123456, expires_at=timezone.now())
+        Favorite.objects.create(user=user, product=product)
+
+
+# Saving a user fires signals that use the cache; a local one keeps these tests off Redis
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class PasswordHashersTests(TestCase):
+    def test_legacy_hash_logs_in_and_is_rehashed(self):
+        preferred = get_hasher().algorithm
+        for algorithm in {"pbkdf2_sha1", "pbkdf2_sha256", "argon2", "scrypt"} - {preferred}:
+            with self.subTest(algorithm=algorithm):
+                user = User.objects.create_user(email=f"{algorithm}@example.com")
+                User.objects.filter(pk=user.pk).update(password=make_password("password", hasher=algorithm))
+                self.assertEqual(authenticate(email=user.email, password="password"), user)
+                user.refresh_from_db()
+                self.assertEqual(identify_hasher(user.password).algorithm, preferred)
+                self.assertTrue(user.check_password("password"))
+
+
+class TokenRevocationTests(RedisTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="member@example.com", password="password")
+        cache.delete(user_revoked_key(self.user.pk))
+
+    def test_deactivating_revokes_tokens(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertIsNotNone(cache.get(user_revoked_key(user.pk)))
+
+    def test_creating_an_inactive_user_revokes_nothing(self):
+        user = User.objects.create_user(email="new@example.com", password="password", is_active=False)
+        self.assertIsNone(cache.get(user_revoked_key(user.pk)))
+
+    def test_saving_an_inactive_user_again_revokes_nothing(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Renamed"
+        user.save()
+        user.is_active = False
+        user.save(update_fields=["first_name"])
+        self.assertIsNone(cache.get(user_revoked_key(user.pk)))
+
+    def test_saving_other_fields_of_a_deactivated_user_revokes_nothing(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save(update_fields=["first_name"])
+        self.assertIsNone(cache.get(user_revoked_key(user.pk)))
+
+
+class TokenBlacklistTests(RedisTestCase):
+    def setUp(self):
+        self.key = cache.make_key(token_blacklist_key("jti"))
+        get_redis_client().delete(self.key)
+
+    def test_entry_expires_with_the_token(self):
+        self.assertTrue(blacklist_token("jti", int(time.time()) + 600))
+        self.assertTrue(is_token_blacklisted("jti"))
+        self.assertTrue(590 <= get_redis_client().ttl(self.key) <= 600)
+
+    def test_token_is_blacklisted_once(self):
+        self.assertTrue(blacklist_token("jti", int(time.time()) + 600))
+        self.assertFalse(blacklist_token("jti", int(time.time()) + 600))
+
+    def test_expired_token_is_not_stored(self):
+        self.assertTrue(blacklist_token("jti", int(time.time()) - 1))
+        self.assertFalse(is_token_blacklisted("jti"))
+
+
+class AdminChangelistTests(AdminQueryCountTestCase):
+    def test_user_changelist(self):
+        self.assertChangelistQueriesConstant(reverse("admin:users_user_changelist") + "?q=example.com", create_users)
+
+    def test_otp_changelist(self):
+        self.assertChangelistQueriesConstant(reverse("admin:users_userotp_changelist"), create_users)
+
+    def test_favorite_changelist(self):
+        self.assertChangelistQueriesConstant(
+            reverse("admin:users_favorite_changelist") + "?q=example.com", create_users
+        )
+
+
+class UserGroupsCacheTests(RedisTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="member@example.com", password="password")
+        self.group = Group.objects.create(name="editors")
+        self.user.groups.add(self.group)
+        invalidate_user_groups([self.user.pk])
+        self.addCleanup(invalidate_user_groups, [self.user.pk])
+
+    def test_removal_is_invalidated_after_commit(self):
+        self.assertEqual(get_user_group_names(self.user.pk), ["editors"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(self.group)
+            # A request reading the old membership before the commit would otherwise cache it again
+            self.assertEqual(cache.get(user_groups_key(self.user.pk)), ["editors"])
+        self.assertEqual(get_user_group_names(self.user.pk), [])
+
+    def test_deleted_group_is_invalidated_for_its_members(self):
+        self.assertEqual(get_user_group_names(self.user.pk), ["editors"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.delete()
+        self.assertEqual(get_user_group_names(self.user.pk), [])
+
+
+class FavoritePaginationTests(APITestCase):
+    # Far below the ties, so that any fallback to an offset within them would show
+    @mock.patch.object(FavoriteCursorPagination, "offset_cutoff", 2)
+    def test_products_liked_together_are_listed_once(self):
+        user = User.objects.create_user(email="liker@example.com", password="password")
+        for product in create_products(0, 9):
+            Favorite.objects.create(user=user, product=product, is_liked=True)
+        # As left by liking them all in one batch request
+        Favorite.objects.update(updated_at=timezone.now())
+        self.client.force_authenticate(user)
+
+        slugs = []
+        url = reverse("accounts:favorites") + "?page_size=4"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            slugs.extend(favorite["slug"] for favorite in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(sorted(slugs), sorted(f"product-{i}" for i in range(9)))
+
+
+class LikedProductIdsTests(RedisTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="liker@example.com", password="password")
+        self.products = create_products(0, 2)
+        Favorite.objects.create(user=self.user, product=self.products[0], is_liked=True)
+        # Ids are reused between tests, and other tests may have cached a set for the same user id
+        keys = [liked_ids_key(self.user.pk), liked_ids_token_key(self.user.pk)]
+        get_redis_client().delete(*keys)
+        self.addCleanup(get_redis_client().delete, *keys)
+
+    def test_writes_update_the_loaded_set(self):
+        self.assertEqual(get_liked_product_ids(self.user.pk), {self.products[0].pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            like_products(self.user.pk, [self.products[1].slug])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_liked_product_ids(self.user.pk), {product.pk for product in self.products})
+
+    def test_write_during_a_rebuild_is_not_lost(self):
+        store = favorites.get_store_liked_ids_script()
+
+        # The like commits after the rebuild read the database, but before it stores what it read
+        def like_then_store(**kwargs):
+            with self.captureOnCommitCallbacks(execute=True):
+                like_products(self.user.pk, [self.products[1].slug])
+            return store(**kwargs)
+
+        with mock.patch.object(favorites, "get_store_liked_ids_script", return_value=like_then_store):
+            self.assertEqual(get_liked_product_ids(self.user.pk), {self.products[0].pk})
+        self.assertEqual(get_liked_product_ids(self.user.pk), {product.pk for product in self.products})
+
+
+class OTPValidationTests(RedisTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="otp@example.com", password="password")
+        reset_otp_data(self.user)
+        self.addCleanup(reset_otp_data, self.user)
+        self.otp = str(send_otp_email(self.user))
+        self.wrong_otp = str((int(self.otp) + 1) % 1000000)
+
+    def assertRejected(self, otp, error):
+        with self.assertRaisesMessage(ValidationError, OTP_ERRORS[error]):
+            validate_otp(self.user, otp)
+
+    def test_valid_code_is_spent_and_marks_the_user_validated(self):
+        self.assertFalse(is_otp_validated(self.user))
+        validate_otp(self.user, self.otp)
+        self.assertTrue(is_otp_validated(self.user))
+        self.assertAlmostEqual(get_redis_client().ttl(otp_keys(self.user.pk)[3]), OTP_VALIDATED_TIMEOUT, delta=5)
+        self.assertRejected(self.otp, "expired")
+
+    def test_wrong_codes_spend_attempts_until_blocked(self):
+        for _ in range(OTP_MAX_ATTEMPTS - 1):
+            self.assertRejected(self.wrong_otp, "invalid")
+        self.assertRejected(self.wrong_otp, "max_attempts")
+        blocked_key = otp_keys(self.user.pk)[2]
+        self.assertAlmostEqual(get_redis_client().ttl(blocked_key), OTP_BLOCK_TIMEOUT, delta=5)
+        # Even the right code is refused until the block expires, and the failed one is gone by then
+        self.assertRejected(self.otp, "blocked")
+        get_redis_client().delete(blocked_key)
+        self.assertRejected(self.otp, "expired")
+
+    def test_right_code_within_the_attempts_is_accepted(self):
+        self.assertRejected(self.wrong_otp, "invalid")
+        validate_otp(self.user, self.otp)
+        self.assertTrue(is_otp_validated(self.user))
+
+    def test_expired_code_is_refused(self):
+        get_redis_client().delete(otp_keys(self.user.pk)[0])
+        self.assertRejected(self.otp, "expired")
+        self.assertFalse(is_otp_validated(self.user))
+
+    def test_new_code_clears_the_validated_flag(self):
+        validate_otp(self.user, self.otp)
+        send_otp_email(self.user)
+        self.assertFalse(is_otp_validated(self.user))
+
+
+class FixedKeyThrottle(SlidingWindowRateThrottle):
+    rate = "3/min"
+
+    def get_cache_key(self, request, view):
+        return "throttle:tests"
+
+
+class SlidingWindowThrottleTests(RedisTestCase):
+    WINDOW = 1000  # Any minute, so that the keys are known in advance
+
+    def setUp(self):
+        keys = [f"throttle:tests:{window}" for window in range(self.WINDOW - 1, self.WINDOW + 4)]
+        get_redis_client().delete(*keys)
+        self.addCleanup(get_redis_client().delete, *keys)
+
+    def allowed(self, seconds):
+        throttle = FixedKeyThrottle()
+        throttle.timer = lambda: self.WINDOW * 60 + seconds
+        return throttle.allow_request(None, None), throttle.wait()
+
+    def test_limit_within_a_window(self):
+        self.assertEqual([self.allowed(10)[0] for _ in range(3)], [True, True, True])
+        self.assertEqual(self.allowed(20), (False, 40))
+
+    def test_previous_window_counts_by_its_overlap(self):
+        for _ in range(3):
+            self.allowed(50)
+        # Half of the previous window still overlaps: 1.5 of its 3 requests count, leaving room for one more
+        self.assertEqual([self.allowed(90)[0] for _ in range(3)], [True, True, False])
+        # Denied requests are not counted; a quarter overlap leaves room again
+        self.assertTrue(self.allowed(105)[0])
+        # Two windows later, the full limit is available again
+        self.assertEqual([self.allowed(180)[0] for _ in range(4)], [True, True, True, False])
+
+    def test_wait_is_the_rest_of_the_window(self):
+        for _ in range(3):
+            self.allowed(0)
+        allowed, wait = self.allowed(15)
+        self.assertFalse(allowed)
+        self.assertEqual(wait, 45)
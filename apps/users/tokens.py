@@ -0,0 +1,58 @@
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+
+from .models import User
+from .utils import blacklist_token, get_user_group_names, is_token_blacklisted, is_token_revoked
+
+# User fields copied into access tokens, enough for StatelessJWTAuthentication to build request.user
+TOKEN_USER_CLAIMS = ("email", "is_active", "is_staff")
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token whose access tokens carry the user's fields and group names, so authentication and
+    permission checks need no lookups. The claims are stamped again on every refresh, so changes reach
+    clients within one access token lifetime; deactivation takes effect at once through revocation.
+
+    The blacklist lives in the cache with entries expiring along with the tokens, instead of the
+    OutstandingToken/BlacklistedToken tables, which grow with every login and refresh.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        # Skip BlacklistMixin.for_user, which records every issued token as an OutstandingToken row
+        return super(BlacklistMixin, cls).for_user(user)
+
+    def check_blacklist(self):
+        if is_token_blacklisted(self[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        if not blacklist_token(self[api_settings.JTI_CLAIM], self["exp"]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        # Checked before rotation resets "iat", so a revoked token cannot be traded for a fresh pair
+        if is_token_revoked(self[api_settings.USER_ID_CLAIM], self.get("iat", 0)):
+            raise TokenError(_("Token is revoked"))
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user_id = self[api_settings.USER_ID_CLAIM]
+        claims = User.objects.filter(pk=user_id).values(*TOKEN_USER_CLAIMS).first()
+        if claims is None:
+            raise TokenError(_("User not found"))
+        for claim, value in claims.items():
+            access[claim] = value
+        access["groups"] = get_user_group_names(user_id)
+        return access
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = UserRefreshToken
@@ -3,7 +3,9 @@ from django.urls import path
 from .views import (
     ConfirmEmailView,
     CustomTokenRefreshView,
+    FavoriteBatchView,
     FavoriteDetailView,
+    FavoriteIdsView,
     FavoriteView,
     LoginView,
     LogoutView,
@@ -43,6 +45,8 @@ urlpatterns = [
     ),
     path("profile", ProfileView.as_view(), name="profile"),
     path("favorites", FavoriteView.as_view(), name="favorites"),
+    path("favorites/batch", FavoriteBatchView.as_view(), name="favorites-batch"),
+    path("favorites/ids", FavoriteIdsView.as_view(), name="favorites-ids"),
     path(
         "favorites/<slug:product_slug>",
         FavoriteDetailView.as_view(),
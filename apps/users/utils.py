@@ -1,47 +1,149 @@
+import functools
 import secrets
-from datetime import timedelta
+import time
 
 from django.conf import settings
+from django.contrib.auth.models import Group
 from django.contrib.auth.password_validation import validate_password
-from django.core.mail import send_mail
-from django.utils import timezone
+from django.core.cache import cache
+
 from rest_framework.exceptions import ValidationError
 
-from .models import UserOTP
+from config.cache import get_redis_client
+
+from .models import OutgoingEmail, User
+
+USER_GROUPS_TIMEOUT = 60 * 60  # 1 hour
+USER_CACHE_TIMEOUT = 60  # 1 minute
+OTP_TIMEOUT = 60 * 3  # 3 minutes
+OTP_MAX_ATTEMPTS = 3
+OTP_BLOCK_TIMEOUT = 60 * 15  # 15 minutes
+OTP_VALIDATED_TIMEOUT = 60 * 15  # 15 minutes
+
+
+def user_groups_key(user_id):
+    return f"user:{user_id}:groups"
+
+
+def get_user_group_names(user_id):
+    names = cache.get(user_groups_key(user_id))
+    if names is None:
+        names = sorted(Group.objects.filter(user__id=user_id).values_list("name", flat=True))
+        cache.set(user_groups_key(user_id), names, USER_GROUPS_TIMEOUT)
+    return names
+
+
+def invalidate_user_groups(user_ids):
+    cache.delete_many([user_groups_key(user_id) for user_id in user_ids])
+
+
+def user_cache_key(user_id):
+    return f"user:{user_id}"
+
+
+def get_full_user(user):
+    # Users built from token claims only have those fields loaded; read the rest through a short-lived cache
+    if not user.get_deferred_fields():
+        return user
+    full_user = cache.get(user_cache_key(user.pk))
+    if full_user is None:
+        full_user = User.objects.get(pk=user.pk)
+        cache.set(user_cache_key(user.pk), full_user, USER_CACHE_TIMEOUT)
+    return full_user
+
+
+def user_revoked_key(user_id):
+    return f"user:{user_id}:revoked_at"
+
+
+def revoke_user_tokens(user_id):
+    # Kept for as long as a refresh token lives, so no token issued before now can be used again
+    cache.set(
+        user_revoked_key(user_id), int(time.time()), settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].total_seconds()
+    )
+
+
+def is_token_revoked(user_id, issued_at):
+    revoked_at = cache.get(user_revoked_key(user_id))
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+def token_blacklist_key(jti):
+    return f"jwt:blacklist:{jti}"
+
+
+def blacklist_token(jti, expires_at):
+    """
+    Blacklist a token id until the token itself expires. Returns False if it was already blacklisted,
+    so two requests racing to rotate the same refresh token cannot both succeed.
+
+    Written to Redis directly, with the token's remaining lifetime as its TTL: an evicted entry would make
+    a revoked token usable again, so Redis must not evict these keys (see maxmemory-policy in the README).
+    """
+    timeout = expires_at - int(time.time())
+    if timeout <= 0:
+        return True  # Expired tokens are rejected anyway
+    return bool(get_redis_client().set(cache.make_key(token_blacklist_key(jti)), 1, ex=timeout, nx=True))
+
+
+def is_token_blacklisted(jti):
+    return bool(get_redis_client().exists(cache.make_key(token_blacklist_key(jti))))
+
+
+def otp_keys(user_id):
+    return [f"otp:{user_id}:{name}" for name in ("code", "attempts", "blocked", "validated")]
+
+
+# Checks the code, spends an attempt or blocks the user in one round trip, so concurrent guesses cannot
+# race past the attempt limit. KEYS: code, attempts, blocked, validated.
+VALIDATE_OTP_SCRIPT = """
+if redis.call("EXISTS", KEYS[3]) == 1 then
+    return "blocked"
+end
+local code = redis.call("GET", KEYS[1])
+if not code then
+    return "expired"
+end
+if code == ARGV[1] then
+    redis.call("DEL", KEYS[1], KEYS[2])
+    redis.call("SET", KEYS[4], 1, "EX", ARGV[3])
+    return "valid"
+end
+if redis.call("DECR", KEYS[2]) <= 0 then
+    redis.call("DEL", KEYS[1], KEYS[2])
+    redis.call("SET", KEYS[3], 1, "EX", ARGV[2])
+    return "max_attempts"
+end
+return "invalid"
+"""
+
+OTP_ERRORS = {
+    "blocked": "Your account is blocked due to too many failed OTP attempts. Please try again later.",
+    "max_attempts": "Maximum OTP attempts reached. Please try again later.",
+    "expired": "The OTP has expired. Please request a new one.",
+    "invalid": "Invalid OTP.",
+}
+
+
+@functools.cache
+def get_validate_otp_script():
+    return get_redis_client().register_script(VALIDATE_OTP_SCRIPT)
 
 
 def reset_otp_data(user):
-    user_otp = UserOTP.objects.get(user=user)
-    user_otp.otp_attempts = 3
-    user_otp.is_blocked = False
-    user_otp.is_validated = False
-    user_otp.save()
+    get_redis_client().delete(*otp_keys(user.pk))
 
 
 def validate_otp(user, otp):
-    user_otp = UserOTP.objects.get(user=user)
-    if not user_otp:
-        raise ValidationError("OTP for this user does not exist.")
-    # Unblock the user if the last OTP attempt was more than 15 minutes ago
-    if user_otp.updated_at + timedelta(minutes=15) < timezone.now():
-        user_otp.is_blocked = False
-        user_otp.otp_attempts = 3
-        user_otp.save()
-
-    if user_otp.is_blocked:
-        raise ValidationError("Your account is blocked due to too many failed OTP attempts. Please try again later.")
-    if user_otp.is_max_attempts_reached():
-        user_otp.is_blocked = True
-        user_otp.save()
-        raise ValidationError("Maximum OTP attempts reached. Please try again later.")
-    if user_otp.is_expired():
-        user_otp.otp_attempts -= 1
-        user_otp.save()
-        raise ValidationError("The OTP has expired. Please request a new one.")
-    if user_otp.otp != otp:
-        user_otp.otp_attempts -= 1
-        user_otp.save()
-        raise ValidationError("Invalid OTP.")
+    result = get_validate_otp_script()(
+        keys=otp_keys(user.pk), args=[otp, OTP_BLOCK_TIMEOUT, OTP_VALIDATED_TIMEOUT]
+    ).decode()
+    if result != "valid":
+        raise ValidationError(OTP_ERRORS[result])
+
+
+def is_otp_validated(user):
+    return bool(get_redis_client().exists(otp_keys(user.pk)[3]))
 
 
 def validate_password_data(
@@ -74,31 +176,19 @@ def validate_password_data(
 
 
 def send_email(subject, message, recipient_list):
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-            fail_silently=settings.FAIL_SILENTLY,
-        )
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+    # Queued in the caller's transaction and delivered by the send_emails worker, so requests never wait on SMTP
+    OutgoingEmail.objects.create(subject=subject, message=message, recipients=recipient_list)
 
 
 def send_otp_email(user):
     # Generate 6-digit OTP using cryptographically secure random number generator
     otp = secrets.randbelow(1000000)
-    user_otp, created = UserOTP.objects.update_or_create(
-        user=user,
-        defaults={
-            "otp": otp,
-            "expires_at": timezone.now() + timedelta(minutes=3),
-            "updated_at": timezone.now(),
-        },
-    )
-    user_otp.is_validated = False
-    user_otp.save()
+    code_key, attempts_key, _, validated_key = otp_keys(user.pk)
+    with get_redis_client().pipeline() as pipe:
+        pipe.set(code_key, otp, ex=OTP_TIMEOUT)
+        pipe.set(attempts_key, OTP_MAX_ATTEMPTS, ex=OTP_TIMEOUT)
+        pipe.delete(validated_key)
+        pipe.execute()
 
     subject = "OTP Verification"
     message = f"Your OTP is {otp}. It will expire in 3 minutes. Do not share it with anyone."
@@ -1,22 +1,28 @@
+import hashlib
+
 from django.contrib.auth import update_session_auth_hash
-from django.contrib.auth.models import update_last_login
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 from drf_spectacular.utils import OpenApiExample, extend_schema
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from apps.products.models import Product
+from config.pagination import KeysetCursorPagination
 
+from .activity import record_login
+from .favorites import get_liked_product_ids, like_products, unlike_products
 from .models import Favorite, User
 from .serializers import (
     EmailValidationSerializer,
     ErrorResponseSerializer,
+    FavoriteBatchResponseSerializer,
+    FavoriteBatchSerializer,
+    FavoriteIdsSerializer,
     FavoriteSerializer,
     FavoriteSlugSerializer,
     LoginSerializer,
@@ -29,7 +35,8 @@ from .serializers import (
     RegisterSerializer,
     SuccessResponseSerializer,
 )
-from .utils import reset_otp_data, send_confirmation_email, send_otp_email
+from .tokens import UserRefreshToken
+from .utils import get_full_user, reset_otp_data, send_confirmation_email, send_otp_email
 
 
 class CustomTokenRefreshView(TokenRefreshView):
@@ -47,6 +54,8 @@ class CustomTokenRefreshView(TokenRefreshView):
 
 
 class RegisterView(APIView):
+    throttle_scope = "register"
+
     @extend_schema(
         tags=["Users"],
         description="Register a new user account. An OTP will be sent to the user's email for verification.",
@@ -86,6 +95,8 @@ class RegisterView(APIView):
 
 
 class ConfirmEmailView(APIView):
+    throttle_scope = "otp_verify"
+
     @extend_schema(
         tags=["Users"],
         description="Confirm a user's email address using the OTP that was sent after registration",
@@ -109,6 +120,8 @@ class ConfirmEmailView(APIView):
 
 
 class LoginView(APIView):
+    throttle_scope = "login"
+
     @extend_schema(
         tags=["Users"],
         description="Authenticate a user and return JWT tokens",
@@ -139,8 +152,8 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data["user"]
-            update_last_login(None, user)
-            refresh_token = RefreshToken.for_user(user)
+            record_login(user.pk)
+            refresh_token = UserRefreshToken.for_user(user)
             tokens = {
                 "access": str(refresh_token.access_token),
                 "refresh": str(refresh_token),
@@ -168,7 +181,7 @@ class LogoutView(APIView):
             refresh_token = serializer.validated_data["refresh"]
             try:
                 # Decode the refresh token and blacklist it
-                token = RefreshToken(refresh_token)
+                token = UserRefreshToken(refresh_token)
                 token.blacklist()
 
                 return Response(
@@ -181,6 +194,8 @@ class LogoutView(APIView):
 
 
 class PasswordResetView(APIView):
+    throttle_scope = "otp_resend"
+
     @extend_schema(
         tags=["Users"],
         description="Request a password reset. An OTP will be sent to the user's email.",
@@ -231,6 +246,8 @@ class PasswordResetConfirmView(APIView):
 
 
 class OTPResendView(APIView):
+    throttle_scope = "otp_resend"
+
     @extend_schema(
         tags=["Users"],
         description="Resend OTP to the user's email",
@@ -251,6 +268,8 @@ class OTPResendView(APIView):
 
 
 class OTPValidateView(APIView):
+    throttle_scope = "otp_verify"
+
     @extend_schema(
         tags=["Users"],
         description="Validate an OTP",
@@ -286,6 +305,7 @@ class PasswordChangeView(APIView):
         ],
     )
     def post(self, request):
+        request.user = User.objects.get(pk=request.user.pk)  # The password hash is never part of the token claims
         serializer = PasswordChangeSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
             user = serializer.save()
@@ -316,7 +336,7 @@ class ProfileView(APIView):
         ],
     )
     def get(self, request):
-        user = request.user
+        user = get_full_user(request.user)
         serializer = ProfileSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -338,7 +358,7 @@ class ProfileView(APIView):
         ],
     )
     def put(self, request):
-        user = request.user
+        user = User.objects.get(pk=request.user.pk)
         serializer = ProfileSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -346,19 +366,26 @@ class ProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class FavoriteCursorPagination(KeysetCursorPagination):
+    # Keyset pagination over the (user, is_liked, updated_at, id) index: no OFFSET scans, and stable while
+    # liking, including through the ties left by products liked together in one request
+    ordering = ("-updated_at", "-pk")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
 class FavoriteView(APIView):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
         tags=["Favorites"],
-        description="Get list of user's favorite products with pagination",
+        description="Get list of user's favorite products, most recently liked first, with cursor pagination",
         responses={200: FavoriteSerializer(many=True), 404: ErrorResponseSerializer},
         examples=[
             OpenApiExample(
                 "Favorites Paginated Response",
                 value={
-                    "count": 2,
-                    "next": None,
+                    "next": "http://example.com/api/v1/user/favorites?cursor=cD0yMDI1LTAxLTAx",
                     "previous": None,
                     "results": [
                         {
@@ -389,10 +416,12 @@ class FavoriteView(APIView):
     )
     def get(self, request):
         favorites = (
-            Favorite.objects.filter(user=request.user, is_liked=True).select_related("product").order_by("product")
+            Favorite.objects.filter(user=request.user, is_liked=True)
+            .select_related("product__room_category", "product__product_category", "product__manufacturer")
+            .prefetch_related("product__images")
         )
 
-        paginator = PageNumberPagination()
+        paginator = FavoriteCursorPagination()
         paginated_products = paginator.paginate_queryset(favorites, request)
 
         serializer = FavoriteSerializer(paginated_products, many=True, context={"request": request})
@@ -406,27 +435,71 @@ class FavoriteView(APIView):
         examples=[OpenApiExample("Add Favorite Request", value={"product_slug": "modern-sofa"})],
     )
     def post(self, request):
-        product = get_object_or_404(Product, slug=request.data["product_slug"])
-        try:
-            favorite = Favorite.objects.get_or_create(user=request.user, product=product)[0]
-
-            if not favorite.is_liked:
-                favorite.is_liked = True
-                favorite.save()
-                return Response({"message": "Favorite added."}, status=status.HTTP_200_OK)
+        product_slug = request.data.get("product_slug")
+        if not product_slug:
+            return Response({"error": "Product slug is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if like_products(request.user.pk, [product_slug]):
+            return Response({"message": "Favorite added."}, status=status.HTTP_200_OK)
+        # Nothing was written: the product is either liked already or does not exist
+        if Favorite.objects.filter(user=request.user, product__slug=product_slug).exists():
             return Response({"message": "Favorite already added."}, status=status.HTTP_200_OK)
-        except Favorite.DoesNotExist:
-            return Response({"error": "Favorite does not exist."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"error": "Product does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
     @extend_schema(tags=["Favorites"], description="Clear all favorites", responses={200: SuccessResponseSerializer})
     def delete(self, request):
-        favorites = Favorite.objects.filter(user=request.user).select_related("product")
-        for favorite in favorites:
-            favorite.is_liked = False
-            favorite.save()
+        unlike_products(request.user.pk)
         return Response({"message": "All favorites deleted."}, status=status.HTTP_200_OK)
 
 
+class FavoriteBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Favorites"],
+        description="Add or remove many products from favorites at once",
+        request=FavoriteBatchSerializer,
+        responses={200: FavoriteBatchResponseSerializer, 400: ErrorResponseSerializer},
+        examples=[
+            OpenApiExample(
+                "Batch Favorite Request", value={"product_slugs": ["modern-sofa", "oak-table"], "is_liked": True}
+            )
+        ],
+    )
+    def post(self, request):
+        serializer = FavoriteBatchSerializer(data=request.data)
+        if serializer.is_valid():
+            product_slugs = serializer.validated_data["product_slugs"]
+            if serializer.validated_data["is_liked"]:
+                updated = like_products(request.user.pk, product_slugs)
+            else:
+                updated = unlike_products(request.user.pk, product_slugs)
+            return Response({"updated": len(updated)}, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class FavoriteIdsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Favorites"],
+        description=(
+            "Get the ids of all liked products, to mark favorites client-side. "
+            "Send the returned ETag in If-None-Match to get 304 Not Modified while the list is unchanged."
+        ),
+        responses={200: FavoriteIdsSerializer, 304: None},
+        examples=[OpenApiExample("Favorite Ids Response", value={"product_ids": [3, 17, 42]})],
+    )
+    def get(self, request):
+        product_ids = sorted(get_liked_product_ids(request.user.pk))
+        digest = hashlib.md5(",".join(map(str, product_ids)).encode()).hexdigest()
+        headers = {"ETag": f'"{digest}"', "Cache-Control": "private, no-cache"}
+
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if headers["ETag"] in etags or "*" in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response({"product_ids": product_ids}, status=status.HTTP_200_OK, headers=headers)
+
+
 class FavoriteDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -464,7 +537,13 @@ class FavoriteDetailView(APIView):
     def get(self, request, product_slug):
         product = get_object_or_404(Product, slug=product_slug)
         try:
-            favorite = Favorite.objects.get(user=request.user, product=product)
+            favorite = (
+                Favorite.objects.select_related(
+                    "product__room_category", "product__product_category", "product__manufacturer"
+                )
+                .prefetch_related("product__images")
+                .get(user=request.user, product=product)
+            )
             serializer = FavoriteSerializer(favorite)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Favorite.DoesNotExist:
@@ -476,13 +555,8 @@ class FavoriteDetailView(APIView):
         responses={200: SuccessResponseSerializer, 404: ErrorResponseSerializer},
     )
     def delete(self, request, product_slug):
-        product = get_object_or_404(Product, slug=product_slug)
-        try:
-            favorite = Favorite.objects.get(user=request.user, product=product)
-            if favorite.is_liked:
-                favorite.is_liked = False
-                favorite.save()
-                return Response({"message": "Favorite deleted."}, status=status.HTTP_200_OK)
+        if unlike_products(request.user.pk, [product_slug]):
+            return Response({"message": "Favorite deleted."}, status=status.HTTP_200_OK)
+        if Favorite.objects.filter(user=request.user, product__slug=product_slug).exists():
             return Response({"message": "Favorite already deleted."}, status=status.HTTP_200_OK)
-        except Favorite.DoesNotExist:
-            return Response({"error": "Favorite does not exist."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"error": "Favorite does not exist."}, status=status.HTTP_404_NOT_FOUND)
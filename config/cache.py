@@ -0,0 +1,184 @@
+import contextvars
+import functools
+import logging
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.encoding import smart_str
+
+import redis
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = bump_version(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The key is missing or was evicted: restart from a time-based value so that
+        # snapshots stamped with an earlier version can never be served again.
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_versions(keys):
+    """
+    Like bump_version() for each key, in a single round trip to Redis. Returns the new versions in order.
+    """
+    # A missing key restarts from a time-based value, as in bump_version(). Not a Lua script: Lua numbers
+    # are doubles, which cannot hold such a version exactly.
+    restart = time.time_ns()
+    with get_redis_client().pipeline(transaction=False) as pipe:
+        for key in keys:
+            key = cache.make_key(key)
+            pipe.set(key, restart, nx=True)
+            pipe.incr(key)
+        return pipe.execute()[1::2]
+
+
+@functools.cache
+def get_redis_client():
+    # For operations the Django cache API cannot express (pub/sub, scripts, sets)
+    return redis.Redis.from_url(settings.REDIS_CACHE_URL)
+
+
+class ReferenceSnapshot(NamedTuple):
+    data: list  # Serialized rows, as returned by the list endpoint
+    by_slug: dict
+    by_pk: dict
+
+
+_reference_versions = contextvars.ContextVar("reference_versions", default=None)
+_reference_caches = []
+
+
+class ReferenceCache:
+    """
+    Two-tier cache for small tables that rarely change. Every process keeps a snapshot of the whole table
+    stamped with the version it was built from; the version lives in Redis and is bumped when a row is saved
+    or deleted, so a stale snapshot is rebuilt on the next request of every process.
+    """
+
+    def __init__(self, name, model, serializer_class):
+        self.version_key = f"reference:{name}:version"
+        self.model = model
+        self.serializer_class = serializer_class
+        self._snapshot = (None, None)
+        self._lock = threading.Lock()
+        _reference_caches.append(self)
+        post_save.connect(self.invalidate, sender=model, weak=False)
+        post_delete.connect(self.invalidate, sender=model, weak=False)
+
+    def __deepcopy__(self, memo):
+        # Serializer fields deep copy their arguments; all of them must share this one cache
+        return self
+
+    def get(self):
+        version = self.get_current_version()
+        snapshot_version, snapshot = self._snapshot
+        if snapshot_version == version:
+            return snapshot
+        with self._lock:
+            snapshot_version, snapshot = self._snapshot
+            if snapshot_version != version:
+                objects = list(self.model.objects.order_by("pk"))
+                snapshot = ReferenceSnapshot(
+                    data=list(self.serializer_class(objects, many=True).data),
+                    by_slug={obj.slug: obj for obj in objects},
+                    by_pk={obj.pk: obj for obj in objects},
+                )
+                self._snapshot = (version, snapshot)
+        return snapshot
+
+    def get_current_version(self):
+        versions = _reference_versions.get()
+        if versions is None:
+            # Outside a request (commands, shell): check on every read
+            return self.read_version()
+        if self.version_key not in versions:
+            # First reference read of the request: fetch the versions of all caches in one round trip
+            keys = [reference.version_key for reference in _reference_caches]
+            try:
+                versions.update(cache.get_many(keys))
+            except redis.RedisError:
+                logger.warning("Failed to read reference data versions", exc_info=True)
+            if self.version_key not in versions:
+                versions[self.version_key] = self.read_version()
+        return versions[self.version_key]
+
+    def read_version(self):
+        try:
+            return get_version(self.version_key)
+        except redis.RedisError:
+            # Without a version the snapshot cannot be trusted; rebuild it rather than fail the request
+            logger.warning("Failed to read %s", self.version_key, exc_info=True)
+            return object()
+
+    def invalidate(self, **kwargs):
+        def bump():
+            try:
+                bump_version(self.version_key)
+            except redis.RedisError:
+                logger.error("Failed to bump %s, workers may serve stale data", self.version_key, exc_info=True)
+
+        transaction.on_commit(bump)
+
+
+class ReferenceCacheMiddleware:
+    """
+    Reads the reference data versions at most once per request, so that later reads are dict lookups.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _reference_versions.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _reference_versions.reset(token)
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """
+    SlugRelatedField resolved against a ReferenceCache in both directions, without touching the database.
+    """
+
+    def __init__(self, reference, **kwargs):
+        self.reference = reference
+        kwargs.setdefault("queryset", None if kwargs.get("read_only") else reference.model.objects.all())
+        super().__init__(slug_field="slug", **kwargs)
+
+    def get_attribute(self, instance):
+        # Only the foreign key is read, so the related row is never loaded
+        for attr in self.source_attrs[:-1]:
+            instance = getattr(instance, attr)
+        return getattr(instance, f"{self.source_attrs[-1]}_id")
+
+    def to_representation(self, value):
+        obj = self.reference.get().by_pk.get(value)
+        if obj is None:
+            # Created after this request read the version; it is in the snapshot from the next request on
+            return self.reference.model.objects.filter(pk=value).values_list("slug", flat=True).first()
+        return obj.slug
+
+    def to_internal_value(self, data):
+        obj = self.reference.get().by_slug.get(str(data))
+        if obj is None:
+            self.fail("does_not_exist", slug_name=self.slug_field, value=smart_str(data))
+        return obj
@@ -0,0 +1,32 @@
+import time
+from collections import Counter
+
+from django.db import transaction
+
+
+def delete_in_batches(queryset, batch_size=500, pause=0.0, before_delete=None):
+    """
+    Delete the rows matched by ``queryset`` in short transactions of at most ``batch_size`` rows.
+
+    The filter is re-applied when deleting, so rows that stop matching between the select and
+    the delete (e.g. a cart that became active again) are left alone. ``before_delete`` is called
+    with the queryset of each batch in its transaction, just before the delete; it may delete related
+    rows itself more cheaply than the cascade would, and return a Counter of them to be added to the
+    result. Returns a Counter of deleted rows per model label, including cascaded deletes.
+    """
+    deleted = Counter()
+    while True:
+        pks = list(queryset.order_by().values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+        with transaction.atomic():
+            batch = queryset.filter(pk__in=pks)
+            if before_delete is not None:
+                deleted.update(before_delete(batch) or {})
+            _, counts = batch.delete()
+        deleted.update(counts)
+        if len(pks) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
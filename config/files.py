@@ -0,0 +1,150 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Content-addressed media (apps/media/storage.py) and ManifestStaticFilesStorage names change with the content
+HASHED_NAME_RE = re.compile(r"(^|/)blobs/.*[0-9a-f]{64}[^/]*$|\.[0-9a-f]{12}\.[^/.]+$")
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MAX_AGE = 60 * 60
+
+# Precompressed variants written next to the file, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """
+    File-like view of length bytes from the current position: WSGI servers send it with sendfile() through
+    fileno(), ASGI servers read it in blocks.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    # Only single ranges are supported; anything else is answered with the whole file
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+def select_encoding(request, path):
+    accepted = {
+        encoding.split(";")[0].strip() for encoding in request.headers.get("Accept-Encoding", "").lower().split(",")
+    }
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return encoding, suffix
+    return None, ""
+
+
+def serve(request, path, document_root, internal_location=None):
+    """
+    Serve a file below document_root according to FILE_SERVING: "x-accel" and "sendfile" only send headers and
+    let the web server in front of Django send the file (including Range requests), "direct" sends the file
+    from here with Range support.
+    """
+    if any(part.startswith(".") for part in path.split("/")):
+        raise Http404  # Hidden files, e.g. uploads still being written
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404 from None
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    encoding, suffix = select_encoding(request, full_path)
+    stat = os.stat(full_path + suffix)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{suffix}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = respond(request, full_path + suffix, path + suffix, stat.st_size, etag, internal_location)
+        response["Content-Type"] = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        if encoding:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Vary"] = "Accept-Encoding"
+    if HASHED_NAME_RE.search(path):
+        response["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = f"public, max-age={MAX_AGE}"
+    return response
+
+
+def respond(request, full_path, path, size, etag, internal_location):
+    if settings.FILE_SERVING == "x-accel":
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = internal_location + quote(path)
+        return response
+    if settings.FILE_SERVING == "sendfile":
+        response = HttpResponse()
+        response["X-Sendfile"] = full_path
+        return response
+
+    byte_range = None
+    if "Range" in request.headers and request.headers.get("If-Range", etag) == etag:
+        byte_range = parse_range(request.headers["Range"], size)
+        if byte_range and byte_range[0] > byte_range[1]:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    file = open(full_path, "rb")  # Closed by the response
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start + 1), status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def file_urlpatterns():
+    """
+    URL patterns that serve MEDIA_URL and STATIC_URL in production, see FILE_SERVING.
+    """
+    return [
+        re_path(
+            rf"^{re.escape(url.lstrip('/'))}(?P<path>.*)$",
+            serve,
+            {"document_root": root, "internal_location": internal_location},
+        )
+        for url, root, internal_location in (
+            (settings.MEDIA_URL, settings.MEDIA_ROOT, settings.X_ACCEL_MEDIA_LOCATION),
+            (settings.STATIC_URL, settings.STATIC_ROOT, settings.X_ACCEL_STATIC_LOCATION),
+        )
+    ]
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2 with its cost parameters read from settings, so they can be tuned from benchmark_auth results.
+    Hashes made with other parameters are rehashed on the user's next successful login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
@@ -0,0 +1,81 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    CursorPagination keyed on (field, pk) instead of on the field alone.
+
+    DRF's cursor holds only the first ordering field. It pages through rows that share a value with an
+    OFFSET capped at offset_cutoff, so past 1000 products of the same price or rating pages repeat or stop
+    advancing. Here every position is unique, so each page is one index range scan however long the tie.
+    Orderings are a non-nullable field followed by pk in the same direction, e.g. ("-rating", "-pk"), backed
+    by an index ending in (field, id).
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset() with the position filter on (field, pk)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        field, tiebreaker = self.ordering
+        assert tiebreaker.lstrip("-") == "pk" and field.startswith("-") == tiebreaker.startswith("-"), (
+            "Keyset pagination needs a (field, pk) ordering with both in the same direction."
+        )
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        queryset = queryset.order_by(*(reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            queryset = self.filter_after(queryset, current_position, reverse)
+
+        results = list(queryset[offset : offset + self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def filter_after(self, queryset, position, reverse):
+        pk, _, value = position.partition(":")
+        field = self.ordering[0]
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") != reverse else "gt"
+        try:
+            # The first filter bounds the index range scan, the second skips the rows of the tie already served
+            return queryset.filter(**{f"{name}__{lookup}e": value}).filter(
+                Q(**{f"{name}__{lookup}": value}) | Q(**{f"pk__{lookup}": int(pk)})
+            )
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message) from None
+
+    def _get_position_from_instance(self, instance, ordering):
+        pk = instance["pk"] if isinstance(instance, dict) else instance.pk
+        return f"{pk}:{super()._get_position_from_instance(instance, ordering)}"
@@ -47,6 +47,7 @@ CUSTOM_APPS = [
     "apps.categories",
     "apps.manufacturers",
     "apps.products",
+    "apps.media",
 ]
 
 INSTALLED_APPS = [
@@ -60,7 +61,8 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
-    "UPDATE_LAST_LOGIN": True,
+    "UPDATE_LAST_LOGIN": False,  # Recorded by apps.users.activity and flushed in bulk
+    "TOKEN_REFRESH_SERIALIZER": "apps.users.tokens.UserTokenRefreshSerializer",
 }
 
 SPECTACULAR_SETTINGS = {
@@ -71,16 +73,20 @@ SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
 
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL")
+
+# Redis also holds state that must not be lost, such as the refresh token blacklist: run it with
+# maxmemory-policy noeviction, or volatile-* with headroom (see the README)
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        "LOCATION": os.getenv("REDIS_CACHE_URL"),
+        "LOCATION": REDIS_CACHE_URL,
     },
 }
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_RENDERER_CLASSES": [  # Disable Browsable API
         "rest_framework.renderers.JSONRenderer",
@@ -91,14 +97,20 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 20,
     "MAX_PAGE_SIZE": 100,
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.UserRateThrottle",
-        "rest_framework.throttling.AnonRateThrottle",
+        "config.throttling.SlidingWindowUserRateThrottle",
+        "config.throttling.SlidingWindowAnonRateThrottle",
+        "config.throttling.SlidingWindowScopedRateThrottle",
     ],
-    # "DEFAULT_THROTTLE_RATES": {
-    #     "anon": "10/minute",  # anonymous user
-    #     "user": "1000/day",  # authenticated user
-    #     "burst": "5/second",  # burst rate
-    # },
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "60/minute",  # anonymous user
+        "user": "300/minute",  # authenticated user
+        # Scopes set with throttle_scope on individual views
+        "login": "10/minute",
+        "register": "5/minute",
+        "otp_resend": "3/minute",
+        "otp_verify": "10/minute",
+        "search": "30/minute",
+    },
     "DATETIME_FORMAT": "%Y-%m-%dT%H:%M:%S.%fZ",
 }
 
@@ -112,6 +124,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.cache.ReferenceCacheMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -145,6 +158,25 @@ DATABASES = {
     }
 }
 
+# The first hasher hashes new passwords; the others only verify older hashes, which Django rehashes
+# with the first one on the next successful login. Compare them with: python manage.py benchmark_auth
+PASSWORD_HASHER_CHOICES = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "argon2": "config.hashers.Argon2PasswordHasher",  # Requires argon2-cffi
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+}
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = sorted(
+    PASSWORD_HASHER_CHOICES.values(), key=lambda hasher: hasher != PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]
+) + [
+    # Verify only, so that users whose hashes predate PASSWORD_HASHER can still log in (and get rehashed)
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+]
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "102400"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "8"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -248,6 +280,18 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = "media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# How MEDIA_URL and STATIC_URL are served when DEBUG is off: "" (not by Django), "x-accel" (nginx
+# X-Accel-Redirect to the internal locations below), "sendfile" (X-Sendfile) or "direct" (from Django)
+FILE_SERVING = os.getenv("FILE_SERVING", "")
+X_ACCEL_MEDIA_LOCATION = os.getenv("X_ACCEL_MEDIA_LOCATION", "/internal/media/")
+X_ACCEL_STATIC_LOCATION = os.getenv("X_ACCEL_STATIC_LOCATION", "/internal/static/")
+
+STORAGES = {
+    # Uploads are stored once per content, see apps/media/storage.py
+    "default": {"BACKEND": "apps.media.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
 # CORS settings for development
 CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS", "").split(",")  # Allows only this origin to send requests
 CORS_ALLOW_CREDENTIALS = True  # Allows cookies to be sent
@@ -267,3 +311,12 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = 30  # Seconds, so a stalled SMTP server cannot hang a send_emails worker
+OUTGOING_EMAIL_RETENTION_DAYS = 7  # Sent and failed outbox rows are deleted by purge_emails after this many days
+
+# Carts
+CART_RESERVATION_TTL = timedelta(minutes=30)  # How long cart items hold product stock
+# "redis", or "memory" for a single development process: it cannot reach the clients of other workers
+CART_EVENTS_BROKER = os.getenv("CART_EVENTS_BROKER", "redis")
+CART_EVENTS_HEARTBEAT = 15  # Seconds between keep-alive comments on idle event streams
+CART_EVENTS_TICKET_TIMEOUT = 30  # Seconds a ticket from the cart events ticket endpoint stays valid
@@ -0,0 +1,50 @@
+import functools
+import unittest
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+import redis
+
+
+@functools.cache
+def redis_available():
+    try:
+        return redis.Redis.from_url(settings.REDIS_CACHE_URL, socket_connect_timeout=1).ping()
+    except redis.RedisError:
+        return False
+
+
+class RedisTestCase(TestCase):
+    """
+    For code that needs Redis itself (Lua scripts, the cache); skipped when REDIS_CACHE_URL cannot be reached.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if not redis_available():
+            raise unittest.SkipTest("Redis is not available")
+        super().setUpClass()
+
+
+# Silk records every request into the database, which would be counted along with the queries of the page
+@override_settings(MIDDLEWARE=[name for name in settings.MIDDLEWARE if not name.startswith("silk.")])
+class AdminQueryCountTestCase(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser(email="admin@example.com", password="password")
+        self.client.force_login(admin)
+
+    def assertChangelistQueriesConstant(self, url, create_rows):
+        """
+        Render the changelist with a couple of rows, then with more, and fail if the second render needs
+        more queries. create_rows(start, count) adds the rows numbered start to start + count - 1.
+        """
+        create_rows(0, 2)
+        with CaptureQueriesContext(connection) as baseline:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        create_rows(2, 6)
+        with self.assertNumQueries(len(baseline)):
+            self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,76 @@
+import functools
+import logging
+
+import redis
+from rest_framework import throttling
+
+from config.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Sliding window approximated from two fixed windows: the previous window's count is weighted by how much
+# of it still overlaps the sliding window. Two integer keys per client, checked and incremented in one call.
+# KEYS: current window, previous window. ARGV: limit, key timeout, previous window weight.
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call("GET", KEYS[1]) or "0")
+local previous = tonumber(redis.call("GET", KEYS[2]) or "0")
+if previous * tonumber(ARGV[3]) + current >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call("INCR", KEYS[1])
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 1
+"""
+
+
+@functools.cache
+def get_sliding_window_script():
+    return get_redis_client().register_script(SLIDING_WINDOW_SCRIPT)
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    """
+    Replaces the timestamp history of DRF's SimpleRateThrottle, which is rewritten on every request, with
+    two counters per client that are checked and incremented by a single Redis script.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        window, elapsed = divmod(now, self.duration)
+        weight = 1 - elapsed / self.duration
+        self.retry_after = self.duration - elapsed
+        try:
+            return bool(
+                get_sliding_window_script()(
+                    keys=[f"{self.key}:{int(window)}", f"{self.key}:{int(window) - 1}"],
+                    args=[self.num_requests, self.duration * 2, weight],
+                )
+            )
+        except redis.RedisError:
+            # Rate limiting must not take the API down with it
+            logger.warning("Throttle check failed for %s, allowing the request", self.key, exc_info=True)
+            return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class SlidingWindowAnonRateThrottle(throttling.AnonRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class SlidingWindowUserRateThrottle(throttling.UserRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class SlidingWindowScopedRateThrottle(throttling.ScopedRateThrottle, SlidingWindowRateThrottle):
+    """
+    Applies the rate named by the view's ``throttle_scope``; views without one are not limited by it.
+    """
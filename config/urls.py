@@ -4,6 +4,8 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
+from config.files import file_urlpatterns
+
 urlpatterns = [
     path("schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
@@ -24,9 +26,13 @@ urlpatterns = [
     path("api/v1/manufacturer/", include("apps.manufacturers.urls")),
 ]
 
-if settings.DEBUG:
+if settings.FILE_SERVING:
+    urlpatterns += file_urlpatterns()
+elif settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+
+if settings.DEBUG:
     urlpatterns += [
         path("silk/", include("silk.urls", namespace="silk")),
     ]